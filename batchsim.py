@@ -0,0 +1,219 @@
+"""Simulador por lotes de partidas de autojuego con NumPy.
+
+`BatchSimulator` guarda miles de partidas como arrays (casillas bloqueadas,
+valores de las casillas con puntos, casilla de cada caballo, puntuaciones,
+turno) y las avanza todas a la vez, una jugada por paso: los saltos de
+caballo de todas las partidas se generan con una sola indexación sobre la
+tabla de saltos de `bitboard.KnightTables`.
+
+Las reglas son las de `Game` con `apply_pass` (quien no puede moverse
+mientras el otro sí pierde `Game.PASS_PENALTY` puntos) y las partidas son
+las de `create_random_game(seed=seed + i)`. Cada paso consume un número
+aleatorio por partida de `numpy.random.default_rng(seed)`; `reference_game`
+juega la misma partida con `Game` a partir de esos números, de modo que
+`verify` puede comprobar que los resultados coinciden.
+
+NumPy es opcional: solo lo necesita este módulo.
+
+    python batchsim.py --games 10000 --policy greedy --check 20
+"""
+import argparse
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+try:
+    import numpy as np
+except ImportError:  # NumPy es opcional (ver docstring)
+    np = None
+
+from bitboard import knight_tables
+from game import create_random_game, Game, KNIGHT_DELTAS
+
+POLICIES = ("random", "greedy")
+
+
+def _require_numpy() -> None:
+    if np is None:
+        raise ImportError("batchsim needs NumPy (pip install numpy)")
+
+
+def choose_move(moves, game: Game, policy: str, roll: float):
+    """Jugada de `policy` entre `moves` (en el orden de `generate_moves_for_player`).
+
+    "random" toma `moves[int(roll * len(moves))]`; "greedy" la de más puntos
+    en destino (0 si la casilla no tiene), la primera en caso de empate.
+    """
+    if policy == "greedy":
+        return max(moves, key=lambda m: game.board.get_points(m[1]))
+    return moves[int(roll * len(moves))]
+
+
+class BatchSimulator:
+    """`games` partidas de `size` x `size` jugadas a la vez con `policy`.
+
+    Solo modela lo que crea `Game.initialize`: dos jugadores con un caballo
+    cada uno (H1 de P1 y H2 de P2), empezando P1. Las casillas se numeran
+    `y * size + x`; la columna extra `size * size` hace de casilla fuera del
+    tablero (siempre bloqueada) para rellenar las filas de saltos.
+    """
+
+    def __init__(self, games: int, size: int = 8, seed: int = 0, policy: str = "random"):
+        _require_numpy()
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown policy {policy!r}")
+        self.games = games
+        self.size = size
+        self.seed = seed
+        self.policy = policy
+        tables = knight_tables(size, size, KNIGHT_DELTAS)
+        cells = tables.size
+        self.targets = np.full((cells + 1, 8), cells, dtype=np.int64)
+        for sq, row in enumerate(tables.targets):
+            self.targets[sq, :len(row)] = row
+
+        self.blocked = np.zeros((games, cells + 1), dtype=bool)
+        self.blocked[:, cells] = True
+        self.values = np.zeros((games, cells + 1), dtype=np.int32)
+        self.horses = np.zeros((games, 2), dtype=np.int64)
+        self.scores = np.zeros((games, 2), dtype=np.int32)
+        self.turn = np.zeros(games, dtype=np.int64)
+        self.over = np.zeros(games, dtype=bool)
+        self.plies = np.zeros(games, dtype=np.int32)
+        self.passes = np.zeros(games, dtype=np.int32)
+        for i in range(games):
+            game = create_random_game(width=size, height=size, seed=seed + i, player_ids=["P1", "P2"])
+            for pos in game.board.blocked:
+                self.blocked[i, tables.square(pos)] = True
+            for pos, value in game.board.points.items():
+                self.values[i, tables.square(pos)] = value
+            for side, hid in enumerate(("H1", "H2")):
+                self.horses[i, side] = tables.square(game.horses[hid].pos)
+        self.rng = np.random.default_rng(seed)
+        self.steps = 0
+
+    def step(self) -> int:
+        """Avanza una jugada (o un pase) en todas las partidas en curso; devuelve cuántas siguen."""
+        # un número por partida y paso, también para las terminadas (ver `reference_game`)
+        rolls = self.rng.random(self.games)
+        self.steps += 1
+        live = np.flatnonzero(~self.over)
+        if not live.size:
+            return 0
+        turn = self.turn[live]
+        cand = self.targets[self.horses[live]]                                # (n, 2, 8)
+        legal = ~self.blocked[live[:, None, None], cand]
+        counts = legal.sum(axis=2)
+        rows = np.arange(live.size)
+        mine = counts[rows, turn]
+        theirs = counts[rows, 1 - turn]
+
+        ended = (mine == 0) & (theirs == 0)
+        self.over[live[ended]] = True
+        passing = (mine == 0) & ~ended
+        if passing.any():
+            self.scores[live[passing], turn[passing]] -= Game.PASS_PENALTY
+            self.passes[live[passing]] += 1
+
+        moving = mine > 0
+        if moving.any():
+            idx = live[moving]
+            side = turn[moving]
+            own_legal = legal[rows[moving], side]                             # (m, 8)
+            own_cand = cand[rows[moving], side]
+            if self.policy == "greedy":
+                gains = np.where(own_legal, self.values[idx[:, None], own_cand], np.iinfo(np.int32).min)
+                choice = gains.argmax(axis=1)
+            else:
+                k = (rolls[idx] * mine[moving]).astype(np.int64)
+                choice = (own_legal.cumsum(axis=1) > k[:, None]).argmax(axis=1)
+            dest = own_cand[np.arange(idx.size), choice]
+            self.scores[idx, side] += self.values[idx, dest]
+            self.values[idx, dest] = 0
+            self.blocked[idx, dest] = True
+            self.horses[idx, side] = dest
+
+        advanced = live[~ended]
+        self.plies[advanced] += 1
+        self.turn[advanced] ^= 1
+        return int(advanced.size)
+
+    def run(self) -> Dict[str, Any]:
+        """Juega todas las partidas hasta el final y devuelve el resumen con partidas por segundo."""
+        start = time.perf_counter()
+        while self.step():
+            pass
+        elapsed = time.perf_counter() - start
+        margin = self.scores[:, 0] - self.scores[:, 1]
+        return {
+            "games": self.games,
+            "p1_wins": int((margin > 0).sum()),
+            "draws": int((margin == 0).sum()),
+            "p2_wins": int((margin < 0).sum()),
+            "avg_plies": float(self.plies.mean()),
+            "seconds": elapsed,
+            "games_per_sec": self.games / elapsed if elapsed else 0.0,
+        }
+
+    def result(self, index: int) -> Dict[str, Any]:
+        return {
+            "scores": [int(s) for s in self.scores[index]],
+            "plies": int(self.plies[index]),
+            "passes": int(self.passes[index]),
+        }
+
+    def reference_game(self, index: int) -> Dict[str, Any]:
+        """Juega la partida `index` con `Game` usando los mismos números aleatorios."""
+        game = create_random_game(width=self.size, height=self.size, seed=self.seed + index,
+                                  player_ids=["P1", "P2"])
+        rng = np.random.default_rng(self.seed)
+        plies = passes = 0
+        while True:
+            roll = rng.random(self.games)[index]
+            if game.is_game_over()[0]:
+                break
+            moves = game.generate_moves_for_player(game.turn)
+            if not moves:
+                game.apply_pass()
+                passes += 1
+            else:
+                hid, to = choose_move(moves, game, self.policy, roll)
+                game.apply_move(hid, to)
+            plies += 1
+        return {"scores": [game.scores["P1"], game.scores["P2"]], "plies": plies, "passes": passes}
+
+    def verify(self, sample: int) -> List[int]:
+        """Índices, entre las `sample` primeras partidas, cuyo resultado difiere de `Game`."""
+        return [i for i in range(min(sample, self.games)) if self.result(i) != self.reference_game(i)]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Autojuego por lotes con NumPy")
+    parser.add_argument('--games', type=int, default=10000, help='number of games in the batch')
+    parser.add_argument('--size', type=int, default=8, help='board size')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the first game and of the moves')
+    parser.add_argument('--policy', type=str, choices=POLICIES, default='random', help='move policy')
+    parser.add_argument('--check', type=int, default=0,
+                        help='replay the first N games with Game and compare the results')
+    args = parser.parse_args(argv)
+
+    setup = time.perf_counter()
+    sim = BatchSimulator(args.games, size=args.size, seed=args.seed, policy=args.policy)
+    setup = time.perf_counter() - setup
+    summary = sim.run()
+    print(f"{summary['games']} partidas de {args.size}x{args.size} ({args.policy}) en "
+          f"{summary['seconds']:.2f} s: {summary['games_per_sec']:.0f} partidas/s "
+          f"(preparación {setup:.2f} s)")
+    print(f"P1 gana: {summary['p1_wins']}  Empates: {summary['draws']}  P2 gana: {summary['p2_wins']}  "
+          f"Jugadas por partida: {summary['avg_plies']:.1f}")
+    if args.check:
+        mismatches = sim.verify(args.check)
+        if mismatches:
+            print(f"Distintas de Game: {mismatches}")
+            return 1
+        print(f"Las {min(args.check, args.games)} primeras coinciden con Game.")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
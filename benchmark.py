@@ -0,0 +1,241 @@
+"""Banco de pruebas reproducible para la búsqueda de `AIPlayer`.
+
+Se genera un corpus fijo de posiciones con `create_random_game(seed=...)`
+(apertura, medio juego y casi final, en 8x8 y en tableros mayores) y cada una
+se pasa por `AIPlayer.get_best_move` a varias profundidades, midiendo tiempo,
+nodos, nodos por segundo y memoria pico.
+
+Uso:
+
+    python benchmark.py --save benchmark_baseline.json    # guarda la línea base
+    python benchmark.py --compare benchmark_baseline.json # falla (exit 1) si empeora
+
+Una métrica empeora si el total de la suite supera a la línea base en más de
+`--threshold` (10 % por defecto): más tiempo, más nodos, menos nodos por
+segundo o más memoria pico. El tiempo es la mejor de `--repeat` ejecuciones y
+la memoria se mide en una pasada aparte con `tracemalloc` para no falsear los
+tiempos.
+
+    python benchmark.py --scaling 8,16,32,64
+
+mide en cambio el coste por jugada de las reglas (`generate_moves_for_player`,
+`is_game_over`, `apply_move`) según el tamaño del tablero, que debería
+mantenerse plano.
+"""
+import argparse
+import json
+import random
+import sys
+import time
+import tracemalloc
+from typing import Any, Dict, List, Optional, Tuple
+
+from game import create_random_game, AIPlayer, Game
+
+# (nombre, tamaño, semilla, plies jugados antes de medir)
+CORPUS: List[Tuple[str, int, int, int]] = [
+    ("opening-8x8-s1", 8, 1, 0),
+    ("opening-8x8-s2", 8, 2, 0),
+    ("midgame-8x8-s3", 8, 3, 12),
+    ("midgame-8x8-s4", 8, 4, 12),
+    ("endgame-8x8-s5", 8, 5, 24),
+    ("endgame-8x8-s6", 8, 6, 24),
+    ("opening-12x12-s7", 12, 7, 0),
+    ("midgame-12x12-s8", 12, 8, 20),
+    ("opening-16x16-s9", 16, 9, 0),
+]
+
+DEFAULT_DEPTHS = (2, 4, 6)
+SCALING_SIZES = (8, 16, 32, 64)
+
+# métrica -> True si un valor mayor es peor
+METRICS = {
+    "time": True,
+    "nodes": True,
+    "nps": False,
+    "peak_kb": True,
+}
+
+
+def build_position(size: int, seed: int, plies: int) -> Game:
+    """Posición reproducible: `plies` jugadas al azar (con semilla) y turno de P1."""
+    game = create_random_game(width=size, height=size, seed=seed, player_ids=["P1", "P2"])
+    rnd = random.Random(seed)
+    for _ in range(plies):
+        if game.is_game_over()[0]:
+            break
+        moves = game.generate_moves_for_player(game.turn)
+        if not moves:
+            game.apply_pass()
+            continue
+        hid, to = rnd.choice(moves)
+        game.apply_move(hid, to)
+    if game.turn != "P1":
+        game._switch_turn()
+    return game
+
+
+def run_case(game: Game, depth: int, repeat: int, measure_memory: bool) -> Dict[str, Any]:
+    best_time = None
+    nodes = 0
+    move = None
+    for _ in range(repeat):
+        ai = AIPlayer("P1", depth)
+        start = time.perf_counter()
+        move = ai.get_best_move(game)
+        elapsed = time.perf_counter() - start
+        nodes = ai.nodes
+        if best_time is None or elapsed < best_time:
+            best_time = elapsed
+    result = {
+        "move": list(move[1]) if move else None,
+        "time": best_time,
+        "nodes": nodes,
+        "nps": nodes / best_time if best_time else 0.0,
+    }
+    if measure_memory:
+        tracemalloc.start()
+        AIPlayer("P1", depth).get_best_move(game)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        result["peak_kb"] = peak / 1024.0
+    return result
+
+
+def run_suite(depths=DEFAULT_DEPTHS, repeat: int = 3, measure_memory: bool = True,
+              corpus=CORPUS, log=None) -> Dict[str, Any]:
+    cases: Dict[str, Dict[str, Any]] = {}
+    for name, size, seed, plies in corpus:
+        game = build_position(size, seed, plies)
+        if not game.generate_moves_for_player("P1"):
+            continue
+        for depth in depths:
+            case_id = f"{name}-d{depth}"
+            cases[case_id] = run_case(game, depth, repeat, measure_memory)
+            if log is not None:
+                c = cases[case_id]
+                log.write(f"{case_id:24s} {c['time'] * 1000:9.1f} ms {c['nodes']:9d} nodos "
+                          f"{c['nps']:9.0f} nodos/s" +
+                          (f" {c['peak_kb']:9.1f} KB" if 'peak_kb' in c else "") + "\n")
+    return {"version": 1, "depths": list(depths), "cases": cases, "totals": totals(cases)}
+
+
+def totals(cases: Dict[str, Dict[str, Any]]) -> Dict[str, float]:
+    total_time = sum(c["time"] for c in cases.values())
+    total_nodes = sum(c["nodes"] for c in cases.values())
+    result = {
+        "time": total_time,
+        "nodes": total_nodes,
+        "nps": total_nodes / total_time if total_time else 0.0,
+    }
+    peaks = [c["peak_kb"] for c in cases.values() if "peak_kb" in c]
+    if peaks:
+        result["peak_kb"] = max(peaks)
+    return result
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """Devuelve la lista de métricas que empeoran más de `threshold` respecto a la base."""
+    common = [k for k in current["cases"] if k in baseline["cases"]]
+    cur = totals({k: current["cases"][k] for k in common})
+    base = totals({k: baseline["cases"][k] for k in common})
+    regressions = []
+    for metric, higher_is_worse in METRICS.items():
+        if metric not in cur or metric not in base or not base[metric]:
+            continue
+        change = (cur[metric] - base[metric]) / base[metric]
+        if (change if higher_is_worse else -change) > threshold:
+            regressions.append(f"{metric}: {base[metric]:.4g} -> {cur[metric]:.4g} ({change:+.1%})")
+    return regressions
+
+
+def movegen_scaling(sizes=SCALING_SIZES, plies: int = 60, repeat: int = 3,
+                    seed: int = 1) -> Dict[int, Dict[str, float]]:
+    """Microsegundos por llamada a las reglas del juego según el tamaño.
+
+    En cada tamaño se juegan hasta `plies` jugadas al azar (con semilla) y se
+    cronometra cada llamada; se guarda la mejor media de `repeat` partidas.
+    """
+    results: Dict[int, Dict[str, float]] = {}
+    for size in sizes:
+        best: Dict[str, float] = {}
+        for _ in range(repeat):
+            game = create_random_game(width=size, height=size, seed=seed, player_ids=["P1", "P2"])
+            rnd = random.Random(seed)
+            spent = {"movegen_us": 0.0, "game_over_us": 0.0, "apply_us": 0.0}
+            calls = {"movegen_us": 0, "game_over_us": 0, "apply_us": 0}
+            for _ in range(plies):
+                start = time.perf_counter()
+                moves = game.generate_moves_for_player(game.turn)
+                spent["movegen_us"] += time.perf_counter() - start
+                calls["movegen_us"] += 1
+                start = time.perf_counter()
+                over = game.is_game_over()[0]
+                spent["game_over_us"] += time.perf_counter() - start
+                calls["game_over_us"] += 1
+                if over:
+                    break
+                if not moves:
+                    game.apply_pass()
+                    continue
+                hid, to = rnd.choice(moves)
+                start = time.perf_counter()
+                game.apply_move(hid, to)
+                spent["apply_us"] += time.perf_counter() - start
+                calls["apply_us"] += 1
+            for key in spent:
+                per_call = 1e6 * spent[key] / calls[key] if calls[key] else 0.0
+                if key not in best or per_call < best[key]:
+                    best[key] = per_call
+        best["point_cells"] = len(create_random_game(width=size, height=size, seed=seed).board.points)
+        results[size] = best
+    return results
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark de la búsqueda de AIPlayer")
+    parser.add_argument('--depths', type=str, default=",".join(str(d) for d in DEFAULT_DEPTHS),
+                        help='comma separated search depths')
+    parser.add_argument('--repeat', type=int, default=3, help='runs per case (best time is kept)')
+    parser.add_argument('--no-memory', action='store_true', help='skip the tracemalloc pass')
+    parser.add_argument('--save', type=str, help='write results as the new baseline')
+    parser.add_argument('--compare', type=str, help='baseline file to compare against')
+    parser.add_argument('--threshold', type=float, default=0.10, help='allowed regression (fraction)')
+    parser.add_argument('--scaling', type=str,
+                        help='comma separated board sizes: time the game rules per move instead of the search')
+    args = parser.parse_args(argv)
+
+    if args.scaling:
+        sizes = tuple(int(s) for s in args.scaling.split(","))
+        for size, r in movegen_scaling(sizes, repeat=args.repeat).items():
+            print(f"{size:3d}x{size:<3d} {r['point_cells']:5d} casillas con puntos  "
+                  f"movegen {r['movegen_us']:6.1f} us  fin de partida {r['game_over_us']:6.1f} us  "
+                  f"jugada {r['apply_us']:6.1f} us")
+        return 0
+
+    depths = tuple(int(d) for d in args.depths.split(","))
+    results = run_suite(depths, repeat=args.repeat, measure_memory=not args.no_memory, log=sys.stdout)
+    t = results["totals"]
+    print(f"Total: {t['time']:.3f} s, {t['nodes']} nodos, {t['nps']:.0f} nodos/s" +
+          (f", pico {t['peak_kb']:.1f} KB" if 'peak_kb' in t else ""))
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Línea base guardada en {args.save}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print("Regresiones respecto a la línea base:")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print("Sin regresiones respecto a la línea base.")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,419 @@
+"""Representación compacta del estado para la búsqueda de la IA.
+
+Cada casilla (x, y) se numera como `y * width + x` y los conjuntos de casillas
+(bloqueadas, con puntos positivos, con puntos negativos, ocupadas por
+caballos) se guardan como enteros usados como máscaras de bits. Los saltos de
+caballo de cada casilla se precalculan una sola vez por tamaño de tablero, de
+modo que generar movimientos o contar la movilidad se reduce a operaciones
+AND y a contar bits.
+
+`BitboardState.from_game` traduce un `Game` leyendo su tablero, caballos,
+turno y marcador; `game` importa este módulo, no al revés.
+"""
+import random
+from collections import deque
+from typing import Dict, List, Optional, Sequence, Tuple
+
+Position = Tuple[int, int]
+# (horse_index, destination_square)
+BitMove = Tuple[int, int]
+# (horse_index, from_square, to_square, collected_points, previous_turn);
+# horse_index es -1 para un pase
+BitUndo = Tuple[int, int, int, Optional[int], int]
+
+try:
+    popcount = int.bit_count
+except AttributeError:  # Python < 3.10
+    def popcount(mask: int) -> int:
+        return bin(mask).count("1")
+
+
+class KnightTables:
+    """Saltos de caballo precalculados para un tamaño de tablero.
+
+    - `targets[sq]`: casillas destino dentro del tablero, en el mismo orden que
+      los deltas recibidos (así el orden de los movimientos coincide con
+      `Horse.possible_moves`).
+    - `attacks[sq]`: las mismas casillas como máscara de bits.
+    - `z_*`: claves Zobrist de 64 bits (fijas, generadas con semilla) para
+      casillas bloqueadas, casillas con puntos, caballos de cada lado y turno.
+    - `distance_row(sq)`: distancia exacta en saltos de caballo desde `sq` a
+      cada casilla (`UNREACHABLE` si no se puede llegar). Cada fila se calcula
+      con un BFS la primera vez y queda guardada, así que tras el primer uso
+      la consulta es O(1); `blocked_distance_row` es la variante que evita las
+      casillas bloqueadas, con caché acotada. `within(sq, k)` da como máscara
+      las casillas a como mucho `k` saltos.
+    """
+
+    ZOBRIST_SEED = 0x5EED
+    UNREACHABLE = -1
+    # filas con bloqueos guardadas antes de vaciar la caché
+    BLOCKED_ROWS_LIMIT = 1 << 15
+
+    def __init__(self, width: int, height: int, deltas: Sequence[Position]):
+        self.width = width
+        self.height = height
+        self.deltas = tuple(deltas)
+        self.size = width * height
+        self.coords: List[Position] = [(sq % width, sq // width) for sq in range(self.size)]
+        self.targets: List[Tuple[int, ...]] = []
+        self.attacks: List[int] = []
+        for x0, y0 in self.coords:
+            targets = []
+            mask = 0
+            for dx, dy in deltas:
+                x, y = x0 + dx, y0 + dy
+                if 0 <= x < width and 0 <= y < height:
+                    sq = y * width + x
+                    targets.append(sq)
+                    mask |= 1 << sq
+            self.targets.append(tuple(targets))
+            self.attacks.append(mask)
+        rnd = random.Random(self.ZOBRIST_SEED ^ (width << 16) ^ height)
+        self.z_blocked = [rnd.getrandbits(64) for _ in range(self.size)]
+        self.z_points = [rnd.getrandbits(64) for _ in range(self.size)]
+        self.z_horse = [[rnd.getrandbits(64) for _ in range(self.size)] for _ in range(2)]
+        self.z_turn = rnd.getrandbits(64)
+        self._distance_rows: List[Optional[List[int]]] = [None] * self.size
+        self._blocked_rows: Dict[Tuple[int, int], List[int]] = {}
+        self._within_masks: List[Optional[List[int]]] = [None] * self.size
+
+    def square(self, pos: Position) -> int:
+        x, y = pos
+        return y * self.width + x
+
+    def _bfs(self, sq: int, blocked: int) -> List[int]:
+        dist = [self.UNREACHABLE] * self.size
+        dist[sq] = 0
+        queue = deque([sq])
+        targets = self.targets
+        while queue:
+            cur = queue.popleft()
+            d = dist[cur] + 1
+            for to in targets[cur]:
+                if dist[to] < 0 and not (blocked >> to) & 1:
+                    dist[to] = d
+                    queue.append(to)
+        return dist
+
+    def distance_row(self, sq: int) -> List[int]:
+        row = self._distance_rows[sq]
+        if row is None:
+            row = self._bfs(sq, 0)
+            self._distance_rows[sq] = row
+        return row
+
+    def distance(self, a: int, b: int) -> int:
+        """Distancia mínima en saltos de caballo entre dos casillas del tablero vacío."""
+        return self.distance_row(a)[b]
+
+    def within(self, sq: int, k: int) -> int:
+        """Máscara de las casillas a entre 1 y `k` saltos de `sq` (tablero vacío)."""
+        masks = self._within_masks[sq]
+        if masks is None:
+            row = self.distance_row(sq)
+            by_distance = [0] * (max(row) + 1)
+            for target, d in enumerate(row):
+                if d > 0:
+                    by_distance[d] |= 1 << target
+            masks = [0]
+            for mask in by_distance[1:]:
+                masks.append(masks[-1] | mask)
+            self._within_masks[sq] = masks
+        return masks[k] if k < len(masks) else masks[-1]
+
+    def all_distances(self) -> List[List[int]]:
+        """Calcula (si falta) y devuelve la tabla completa de distancias."""
+        return [self.distance_row(sq) for sq in range(self.size)]
+
+    def blocked_distance_row(self, sq: int, blocked: int) -> List[int]:
+        """Como `distance_row`, pero sin pasar por casillas de `blocked`.
+
+        La casilla de salida puede estar bloqueada (lo está siempre la del
+        propio caballo).
+        """
+        blocked &= ~(1 << sq)
+        key = (sq, blocked)
+        row = self._blocked_rows.get(key)
+        if row is None:
+            if len(self._blocked_rows) >= self.BLOCKED_ROWS_LIMIT:
+                self._blocked_rows.clear()
+            row = self._bfs(sq, blocked)
+            self._blocked_rows[key] = row
+        return row
+
+
+_TABLES: Dict[Tuple[int, int, Tuple[Position, ...]], KnightTables] = {}
+
+
+def knight_tables(width: int, height: int, deltas: Sequence[Position]) -> KnightTables:
+    """Devuelve (creándolas la primera vez) las tablas para `width` x `height`."""
+    key = (width, height, tuple(deltas))
+    tables = _TABLES.get(key)
+    if tables is None:
+        tables = KnightTables(width, height, deltas)
+        _TABLES[key] = tables
+    return tables
+
+
+def iter_bits(mask: int):
+    """Itera los índices de los bits activos de `mask`, de menor a mayor."""
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+class BitboardState:
+    """Estado de juego para la búsqueda, con `make`/`unmake` reversibles.
+
+    Solo modela partidas de dos jugadores. El lado 0 es el primer jugador en
+    orden alfabético y el lado 1 el segundo, igual que el ciclo de turnos de
+    `Game._switch_turn`.
+    """
+
+    def __init__(self, tables: KnightTables, players: Sequence[str]):
+        self.tables = tables
+        self.width = tables.width
+        self.height = tables.height
+        self.players: List[str] = list(players)
+        self.blocked = 0
+        self.positive = 0
+        self.negative = 0
+        self.occupied = 0
+        # valor de puntos de cada casilla (0 si no tiene)
+        self.values: List[int] = [0] * tables.size
+        # casillas con puntos en el orden del dict `board.points` original
+        self.point_order: List[int] = []
+        self.horse_ids: List[str] = []
+        self.horses: List[int] = []
+        self.owners: List[int] = []
+        self.turn = 0
+        self.scores: List[int] = [0, 0]
+        # hash Zobrist incremental de (bloqueadas, casillas con puntos, caballos, turno)
+        self.hash = 0
+        # proximidad de cada caballo a las casillas positivas (ver `track_proximity`)
+        self.proximity: List[float] = []
+        self._tracking_proximity = False
+        self._blocked_aware = False
+        self._proximity_cache: Dict[Tuple[int, int], float] = {}
+        self._proximity_stack: List[List[float]] = []
+
+    @classmethod
+    def from_game(cls, game, deltas: Sequence[Position]) -> 'BitboardState':
+        """Construye el estado a partir de un `Game` inicializado."""
+        players = sorted({h.owner for h in game.horses.values()})
+        if len(players) != 2:
+            raise ValueError("BitboardState requires exactly two players")
+        board = game.board
+        tables = knight_tables(board.width, board.height, deltas)
+        state = cls(tables, players)
+        for pos in board.blocked:
+            state.blocked |= 1 << tables.square(pos)
+        for pos, value in board.points.items():
+            sq = tables.square(pos)
+            state.values[sq] = value
+            state.point_order.append(sq)
+            if value > 0:
+                state.positive |= 1 << sq
+            elif value < 0:
+                state.negative |= 1 << sq
+        for hid, horse in game.horses.items():
+            sq = tables.square(horse.pos)
+            state.horse_ids.append(hid)
+            state.horses.append(sq)
+            state.owners.append(players.index(horse.owner))
+            state.occupied |= 1 << sq
+        state.turn = players.index(game.turn) if game.turn in players else 0
+        state.scores = [game.scores.get(p, 0) for p in players]
+        state.hash = state.compute_hash()
+        return state
+
+    def compute_hash(self) -> int:
+        """Calcula el hash Zobrist desde cero (la búsqueda lo mantiene incrementalmente)."""
+        t = self.tables
+        h = 0
+        for sq in iter_bits(self.blocked):
+            h ^= t.z_blocked[sq]
+        for sq in iter_bits(self.positive | self.negative):
+            h ^= t.z_points[sq]
+        for hidx, sq in enumerate(self.horses):
+            h ^= t.z_horse[self.owners[hidx]][sq]
+        if self.turn:
+            h ^= t.z_turn
+        return h
+
+    def track_proximity(self, blocked_aware: bool = False) -> None:
+        """Mantiene `proximity[hidx]` de forma incremental durante make/unmake.
+
+        `proximity[hidx]` es la suma de `puntos / distancia(caballo, casilla)`
+        sobre las casillas positivas que quedan, con la distancia exacta en
+        saltos de caballo de `KnightTables` (se omiten la propia casilla y las
+        inalcanzables). Con `blocked_aware` la distancia evita las casillas
+        bloqueadas, así que los puntos encerrados dejan de contar.
+
+        Las casillas se recorren en `point_order`; el orden fijo hace que el
+        resultado sea idéntico, bit a bit, a recalcularla desde cero. Un
+        movimiento solo recalcula la suma del caballo que se mueve y, si recoge
+        una casilla positiva (o con `blocked_aware`), la de los demás. Cada suma depende solo de la
+        casilla del caballo y de las casillas positivas restantes (o de las
+        bloqueadas, con `blocked_aware`), así que se guarda en caché con esa
+        clave.
+        """
+        self._tracking_proximity = True
+        self._blocked_aware = blocked_aware
+        self._proximity_cache = {}
+        self._proximity_stack = []
+        self.proximity = [self._horse_proximity(sq) for sq in self.horses]
+
+    def _horse_proximity(self, sq: int) -> float:
+        positive = self.positive
+        if self._blocked_aware:
+            key = (sq, self.blocked)
+        else:
+            key = (sq, positive)
+        total = self._proximity_cache.get(key)
+        if total is not None:
+            return total
+        if self._blocked_aware:
+            row = self.tables.blocked_distance_row(sq, self.blocked)
+        else:
+            row = self.tables.distance_row(sq)
+        values = self.values
+        total = 0
+        for c in self.point_order:
+            if (positive >> c) & 1:
+                d = row[c]
+                if d > 0:
+                    total += values[c] / d
+        self._proximity_cache[key] = total
+        return total
+
+    def set_turn(self, side: int) -> None:
+        if side != self.turn:
+            self.turn = side
+            self.hash ^= self.tables.z_turn
+
+    def __getstate__(self):
+        # Las tablas (y las cachés de proximidad) no viajan al serializar el
+        # estado para otro proceso: se vuelven a obtener allí por tamaño.
+        # Tampoco los métodos envueltos por `SearchStats`.
+        data = {k: v for k, v in self.__dict__.items() if not callable(v)}
+        tables = data.pop("tables")
+        data["_table_key"] = (tables.width, tables.height, tables.deltas)
+        data["_tracking_proximity"] = False
+        data["_proximity_cache"] = {}
+        data["_proximity_stack"] = []
+        data["proximity"] = []
+        return data
+
+    def __setstate__(self, data):
+        width, height, deltas = data.pop("_table_key")
+        self.__dict__.update(data)
+        self.tables = knight_tables(width, height, deltas)
+
+    def side_of(self, player: str) -> int:
+        return self.players.index(player)
+
+    def to_game_move(self, move: BitMove) -> Tuple[str, Position]:
+        """Convierte un movimiento interno a `(horse_id, (x, y))`."""
+        hidx, to = move
+        return self.horse_ids[hidx], self.tables.coords[to]
+
+    def generate_moves(self, side: int) -> List[BitMove]:
+        """Movimientos legales de `side`, en el orden de `Game.generate_moves_for_player`."""
+        taken = self.blocked | self.occupied
+        targets = self.tables.targets
+        moves: List[BitMove] = []
+        for hidx, sq in enumerate(self.horses):
+            if self.owners[hidx] != side:
+                continue
+            for to in targets[sq]:
+                if not (taken >> to) & 1:
+                    moves.append((hidx, to))
+        return moves
+
+    def mobility(self, side: int) -> int:
+        """Número de movimientos legales de `side` (AND + popcount por caballo)."""
+        free = ~(self.blocked | self.occupied)
+        attacks = self.tables.attacks
+        count = 0
+        for hidx, sq in enumerate(self.horses):
+            if self.owners[hidx] == side:
+                count += popcount(attacks[sq] & free)
+        return count
+
+    def has_moves(self, side: int) -> bool:
+        free = ~(self.blocked | self.occupied)
+        attacks = self.tables.attacks
+        for hidx, sq in enumerate(self.horses):
+            if self.owners[hidx] == side and attacks[sq] & free:
+                return True
+        return False
+
+    def is_terminal(self) -> bool:
+        """La partida termina cuando ninguno de los dos lados puede moverse."""
+        return not self.has_moves(0) and not self.has_moves(1)
+
+    def make(self, move: BitMove) -> BitUndo:
+        """Aplica `move` en sitio (sin validar) y devuelve el registro para deshacerlo."""
+        hidx, to = move
+        t = self.tables
+        owner = self.owners[hidx]
+        frm = self.horses[hidx]
+        bit = 1 << to
+        collected = None
+        h = self.hash ^ t.z_horse[owner][frm] ^ t.z_horse[owner][to] ^ t.z_blocked[to] ^ t.z_turn
+        if (self.positive | self.negative) & bit:
+            collected = self.values[to]
+            self.positive &= ~bit
+            self.negative &= ~bit
+            self.scores[owner] += collected
+            h ^= t.z_points[to]
+        self.blocked |= bit
+        self.occupied = (self.occupied & ~(1 << frm)) | bit
+        self.horses[hidx] = to
+        self.hash = h
+        if self._tracking_proximity:
+            proximity = self.proximity
+            self._proximity_stack.append(proximity[:])
+            if self._blocked_aware or (collected is not None and collected > 0):
+                # la casilla nueva bloqueada puede alargar los caminos de todos
+                for i, sq in enumerate(self.horses):
+                    proximity[i] = self._horse_proximity(sq)
+            else:
+                proximity[hidx] = self._horse_proximity(to)
+        prev_turn = self.turn
+        self.turn = 1 - prev_turn
+        return (hidx, frm, to, collected, prev_turn)
+
+    def make_pass(self) -> BitUndo:
+        prev_turn = self.turn
+        self.turn = 1 - prev_turn
+        self.hash ^= self.tables.z_turn
+        return (-1, -1, -1, None, prev_turn)
+
+    def unmake(self, undo: BitUndo) -> None:
+        hidx, frm, to, collected, prev_turn = undo
+        t = self.tables
+        self.turn = prev_turn
+        if hidx < 0:
+            self.hash ^= t.z_turn
+            return
+        owner = self.owners[hidx]
+        h = self.hash ^ t.z_horse[owner][frm] ^ t.z_horse[owner][to] ^ t.z_blocked[to] ^ t.z_turn
+        if collected is not None:
+            h ^= t.z_points[to]
+        self.hash = h
+        bit = 1 << to
+        self.horses[hidx] = frm
+        self.occupied = (self.occupied & ~bit) | (1 << frm)
+        self.blocked &= ~bit
+        if collected is not None:
+            if collected > 0:
+                self.positive |= bit
+            elif collected < 0:
+                self.negative |= bit
+            self.scores[self.owners[hidx]] -= collected
+        if self._tracking_proximity:
+            self.proximity = self._proximity_stack.pop()
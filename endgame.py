@@ -0,0 +1,269 @@
+"""Solución exacta de finales para `AIPlayer`.
+
+Cuando casi todo el tablero está bloqueado, las casillas a las que aún
+puede llegar algún caballo son pocas y la partida se puede resolver por
+completo en lugar de estimarla con la heurística. `EndgameSolver` recorre
+todas las continuaciones sobre `BitboardState` con memoización y devuelve el
+margen final con juego perfecto de ambos lados, aplicando las mismas reglas
+que la GUI: quien no puede moverse mientras el otro sí pierde
+`PASS_PENALTY` puntos en cada turno, y la partida acaba cuando ninguno de
+los dos puede moverse.
+"""
+from typing import Dict, Optional, Tuple
+
+from bitboard import BitboardState, BitMove, iter_bits, popcount
+
+WIN = "win"
+DRAW = "draw"
+LOSS = "loss"
+
+
+def _flood(attacks, frontier: int, free: int) -> int:
+    frontier &= free
+    reached = 0
+    while frontier:
+        reached |= frontier
+        spread = 0
+        for sq in iter_bits(frontier):
+            spread |= attacks[sq]
+        frontier = spread & free & ~reached
+    return reached
+
+
+def _free_cells(state: BitboardState) -> int:
+    return ~(state.blocked | state.occupied) & ((1 << state.tables.size) - 1)
+
+
+def reachable_cells(state: BitboardState) -> int:
+    """Máscara de las casillas libres alcanzables por algún caballo.
+
+    Relleno por inundación con saltos de caballo sobre las casillas no
+    bloqueadas ni ocupadas, partiendo de la casilla de cada caballo.
+    """
+    attacks = state.tables.attacks
+    frontier = 0
+    for sq in state.horses:
+        frontier |= attacks[sq]
+    return _flood(attacks, frontier, _free_cells(state))
+
+
+def side_regions(state: BitboardState) -> Tuple[int, int]:
+    """Casillas libres alcanzables por los caballos de cada lado."""
+    attacks = state.tables.attacks
+    free = _free_cells(state)
+    starts = [0, 0]
+    for hidx, sq in enumerate(state.horses):
+        starts[state.owners[hidx]] |= attacks[sq]
+    return _flood(attacks, starts[0], free), _flood(attacks, starts[1], free)
+
+
+def combine_regions(mover: Dict[int, int], other: Dict[int, int], penalty: int) -> Tuple[int, int]:
+    """Cotas del margen futuro del lado que mueve con regiones separadas.
+
+    `mover` y `other` dan, para cada longitud de camino maximal, los mejores
+    puntos que puede recoger cada lado en su región. Si el que mueve hace `s`
+    saltos y el otro `o`, el que mueve pasa `max(0, o - s)` turnos y el otro
+    `max(0, s - 1 - o)` (la partida acaba cuando ninguno puede moverse).
+
+    Devuelve (max-min, min-max): el que mueve se asegura la primera
+    comprometiéndose con un camino y el otro la segunda; si coinciden, es
+    el valor exacto con juego perfecto.
+    """
+    def margin(s: int, o: int) -> int:
+        return (mover[s] - other[o] - penalty * max(0, o - s) + penalty * max(0, s - 1 - o))
+
+    lower = max(min(margin(s, o) for o in other) for s in mover)
+    upper = min(max(margin(s, o) for s in mover) for o in other)
+    return lower, upper
+
+
+def outcome(margin: int) -> str:
+    return WIN if margin > 0 else LOSS if margin < 0 else DRAW
+
+
+class EndgameSolver:
+    """Resolución exacta por negamax con memoización.
+
+    El valor de una posición es el margen de puntos que todavía gana el lado
+    que mueve hasta el final (puntos recogidos menos penalizaciones, propios
+    menos del rival); no incluye la puntuación ya acumulada. Se guarda en
+    `memo` con la clave (bloqueadas, casillas con puntos, caballos, turno),
+    que determina por completo el resto de la partida.
+
+    La memoria se conserva entre llamadas mientras los valores de las
+    casillas con puntos coincidan (una misma partida), así que las jugadas
+    siguientes del final salen casi gratis. `MAX_ENTRIES` acota su tamaño.
+
+    Si los caballos de cada lado ya no comparten ninguna casilla alcanzable,
+    la partida se descompone en dos problemas de un solo jugador: se calcula
+    aparte el mejor camino de cada caballo por longitud (`path_profile`) y se
+    combinan con `combine_regions`. Cuando las dos cotas coinciden no hace
+    falta recorrer el producto cruzado de ambas regiones.
+    """
+
+    MAX_ENTRIES = 1 << 20
+    # Tamaño máximo de cada región para enumerar sus caminos
+    REGION_CELLS = 24
+
+    def __init__(self, pass_penalty: int = 4):
+        self.pass_penalty = pass_penalty
+        self.memo: Dict[Tuple[int, int, Tuple[int, ...], int], int] = {}
+        self.paths: Dict[Tuple[int, int, int], Dict[int, int]] = {}
+        self.nodes = 0
+        self._values: Optional[list] = None
+        self._size = None
+
+    def clear(self) -> None:
+        self.memo = {}
+        self.paths = {}
+        self._values = None
+        self._size = None
+
+    def _check_memo(self, state: BitboardState) -> None:
+        # Las entradas solo dependen de los valores de sus casillas con puntos,
+        # que son un subconjunto de las de la raíz: si coinciden, se reutilizan.
+        values = self._values
+        if values is not None and self._size == state.tables.size and all(
+                values[sq] == state.values[sq] for sq in iter_bits(state.positive | state.negative)):
+            return
+        self.memo = {}
+        self.paths = {}
+        self._values = list(state.values)
+        self._size = state.tables.size
+
+    def solve(self, state: BitboardState) -> Tuple[Optional[BitMove], int]:
+        """Devuelve (mejor movimiento, margen futuro) para el lado que mueve.
+
+        El movimiento es None si el lado que mueve no tiene jugadas. A igual
+        margen se elige el primero en el orden de generación. `state` vuelve
+        intacto.
+        """
+        self._check_memo(state)
+        if len(self.memo) > self.MAX_ENTRIES:
+            self.memo = {}
+        if len(self.paths) > self.MAX_ENTRIES:
+            self.paths = {}
+        self.nodes = 0
+        side = state.turn
+        best_move = None
+        best = None
+        for move in state.generate_moves(side):
+            gained = self._gain(state, move)
+            undo = state.make(move)
+            value = gained - self._value(state)
+            state.unmake(undo)
+            if best is None or value > best:
+                best = value
+                best_move = move
+        if best is None:
+            best = self._value(state)
+        return best_move, best
+
+    def _gain(self, state: BitboardState, move: BitMove) -> int:
+        to = move[1]
+        if (state.positive | state.negative) >> to & 1:
+            return state.values[to]
+        return 0
+
+    def _value(self, state: BitboardState) -> int:
+        self.nodes += 1
+        side = state.turn
+        key = (state.blocked, state.positive | state.negative, tuple(state.horses), side)
+        value = self.memo.get(key)
+        if value is not None:
+            return value
+        value = self.split_value(state)
+        if value is not None:
+            self.memo[key] = value
+            return value
+        moves = state.generate_moves(side)
+        if moves:
+            value = None
+            for move in moves:
+                gained = self._gain(state, move)
+                undo = state.make(move)
+                score = gained - self._value(state)
+                state.unmake(undo)
+                if value is None or score > value:
+                    value = score
+        elif state.has_moves(1 - side):
+            undo = state.make_pass()
+            value = -self.pass_penalty - self._value(state)
+            state.unmake(undo)
+        else:
+            value = 0
+        self.memo[key] = value
+        return value
+
+    def solve_split(self, state: BitboardState) -> Optional[Tuple[Optional[BitMove], int]]:
+        """Como `solve`, pero solo si las regiones ya están separadas y cada
+        jugada de la raíz se resuelve por descomposición; si no, None.
+
+        Sirve para posiciones con regiones demasiado grandes para `solve`.
+        """
+        self._check_memo(state)
+        self.nodes = 0
+        side = state.turn
+        if self.split_value(state) is None:
+            return None
+        best_move = None
+        best = None
+        for move in state.generate_moves(side):
+            gained = self._gain(state, move)
+            undo = state.make(move)
+            value = self.split_value(state)
+            state.unmake(undo)
+            if value is None:
+                return None
+            value = gained - value
+            if best is None or value > best:
+                best = value
+                best_move = move
+        if best is None:
+            best = self.split_value(state)
+        return best_move, best
+
+    def split_value(self, state: BitboardState) -> Optional[int]:
+        """Margen futuro exacto del lado que mueve si las regiones están
+        separadas y las cotas de `combine_regions` coinciden; si no, None.
+        """
+        if len(state.horses) != 2 or state.owners[0] == state.owners[1]:
+            return None
+        regions = side_regions(state)
+        if regions[0] & regions[1]:
+            return None
+        if max(popcount(regions[0]), popcount(regions[1])) > self.REGION_CELLS:
+            return None
+        profiles = [{}, {}]
+        for hidx, sq in enumerate(state.horses):
+            side = state.owners[hidx]
+            profiles[side] = self.path_profile(state, sq, regions[side])
+        mover = state.turn
+        lower, upper = combine_regions(profiles[mover], profiles[1 - mover], self.pass_penalty)
+        return lower if lower == upper else None
+
+    def path_profile(self, state: BitboardState, sq: int, region: int) -> Dict[int, int]:
+        """Mejores puntos de un caballo solo en `region`, por longitud de
+        camino maximal (`{0: 0}` si no puede moverse).
+        """
+        points = (state.positive | state.negative) & region
+        return self._profile(state.tables.attacks, state.values, sq, region, points)
+
+    def _profile(self, attacks, values, sq: int, free: int, points: int) -> Dict[int, int]:
+        key = (sq, free, points)
+        profile = self.paths.get(key)
+        if profile is not None:
+            return profile
+        self.nodes += 1
+        profile = {}
+        for to in iter_bits(attacks[sq] & free):
+            bit = 1 << to
+            gain = values[to] if points & bit else 0
+            for length, total in self._profile(attacks, values, to, free & ~bit, points & ~bit).items():
+                best = profile.get(length + 1)
+                if best is None or total + gain > best:
+                    profile[length + 1] = total + gain
+        if not profile:
+            profile[0] = 0
+        self.paths[key] = profile
+        return profile
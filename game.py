@@ -1,8 +1,19 @@
-from typing import List, Tuple, Dict, Optional, Set
+from typing import Callable, Container, List, Tuple, Dict, Optional, Set
 import random
 import math
+import time
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from bitboard import BitboardState, BitMove, popcount, iter_bits, knight_tables
+from endgame import EndgameSolver, reachable_cells, outcome
+from record import GameRecord
+from search import (TranspositionTable, SearchAborted, MoveOrderer, HeuristicMoveOrderer, SearchStats,
+                    EXACT, LOWER, UPPER, pool_context, process_pool)
 
 Position = Tuple[int, int]
+# (horse_id, from, to, removed_points, points_index, previous_turn); horse_id is None for a pass
+MoveUndo = Tuple[Optional[str], Optional[Position], Optional[Position], Optional[int], int, Optional[str]]
 
 KNIGHT_DELTAS = [
     (2, 1), (2, -1), (-2, 1), (-2, -1),
@@ -26,26 +37,17 @@ class Horse:
     def __repr__(self) -> str:
         return f"Horse(id={self.id!r}, owner={self.owner!r}, pos={self.pos!r})"
 
-    def possible_moves(self, board: 'Board', occupied: Set[Position]) -> List[Position]:
+    def possible_moves(self, board: 'Board', occupied: Container[Position]) -> List[Position]:
         """Return a list of positions this horse can legally move to.
 
         Rules applied here:
-        - must be in bounds
+        - must be in bounds (the board's precomputed `neighbors` only hold
+          in-bounds destinations, in `KNIGHT_DELTAS` order)
         - cannot land on an occupied cell (no captures)
         - cannot land on a blocked cell
         """
-        moves: List[Position] = []
-        x0, y0 = self.pos
-        for dx, dy in KNIGHT_DELTAS:
-            to = (x0 + dx, y0 + dy)
-            if not board.in_bounds(to):
-                continue
-            if to in occupied:
-                continue
-            if board.is_blocked(to):
-                continue
-            moves.append(to)
-        return moves
+        blocked = board.blocked
+        return [to for to in board.neighbors[self.pos] if to not in occupied and to not in blocked]
 
     def move_and_collect(self, to: Position, board: 'Board') -> int:
         """Move this horse to `to` on `board`, collect points and mark the cell blocked.
@@ -73,15 +75,39 @@ class Board:
 
     The board stores point values per cell and a set of permanently blocked
     positions. It offers helper methods to query and mutate cell state.
+    `neighbors` maps every cell to its in-bounds knight destinations; it is
+    built once per board size and shared by all boards of that size.
+    `version` is bumped by every mutator so `Game` can tell when its
+    memoized queries are stale.
     """
 
     def __init__(self, width: int, height: int, points: Optional[Dict[Position, int]] = None):
         self.width = width
         self.height = height
+        self.neighbors = knight_neighbors(width, height)
         # points map: position -> value
         self.points: Dict[Position, int] = points.copy() if points else {}
         # permanently blocked positions (after a horse visits)
         self.blocked: Set[Position] = set()
+        self.version = 0
+
+    def copy(self) -> 'Board':
+        """Independent copy of the cell state; the neighbor table is shared."""
+        other = Board(self.width, self.height, self.points)
+        other.blocked = set(self.blocked)
+        other.version = self.version
+        return other
+
+    def __getstate__(self):
+        # copies and pickles leave the shared neighbor table out and look it
+        # up again by size, so copying a game never clones it
+        state = self.__dict__.copy()
+        del state["neighbors"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.neighbors = knight_neighbors(self.width, self.height)
 
     def in_bounds(self, pos: Position) -> bool:
         x, y = pos
@@ -93,9 +119,11 @@ class Board:
     def destroy_points(self, pos: Position) -> None:
         if pos in self.points:
             del self.points[pos]
+            self.version += 1
 
     def block_position(self, pos: Position) -> None:
         self.blocked.add(pos)
+        self.version += 1
 
     def is_blocked(self, pos: Position) -> bool:
         return pos in self.blocked
@@ -116,37 +144,72 @@ class Board:
                 del self.points[pos]
         else:
             self.points[pos] = value
+        self.version += 1
 
 
 class Game:
     """Encapsulates the game: board, horses, turn and scores.
 
     Responsibilities:
-    - initialize the board and horses (randomly placing the 10 point cells and the horses)
+    - initialize the board and horses (randomly placing the point cells and the horses)
     - generate and apply moves
     - check end condition
     - run a simple play loop (start)
+
+    Legal moves, occupancy and the end-of-game status are memoized per
+    position: `version` is bumped by `_switch_turn` (so by every move and
+    pass) and by `unmake_move`, and the cache is also dropped when
+    `Board.version` changes. Code that edits `turn`, `horses` or `scores`
+    directly must call `_touch()`.
+
+    Every `apply_move` and `apply_pass` is appended to `log` (a
+    `GameRecord` started by `initialize`; None on boards the record format
+    cannot encode, see `GameRecord.supports`) and can be taken back with
+    `undo_move`; `replay(log, plies)` rebuilds any position of the game.
     """
 
     POINT_VALUES = [-10, -5, -4, -3, -1, 1, 3, 4, 5, 10]
+    # Board area that gets one set of POINT_VALUES (see `point_values`)
+    POINT_AREA = 64
+    # Points lost by a player that has to pass because it has no legal moves
+    PASS_PENALTY = 4
 
     def __init__(self):
         self.board: Optional[Board] = None
         self.horses: Dict[str, Horse] = {}
         self.turn: Optional[str] = None
         self.scores: Dict[str, int] = {}
+        self.version = 0
+        self._memo: Dict[object, object] = {}
+        self._memo_key: Optional[Tuple[int, int]] = None
+        self.log: Optional[GameRecord] = None
+        # (undo record, points) of every logged move, for `undo_move`
+        self._history: List[Tuple[MoveUndo, int]] = []
+
+    @classmethod
+    def point_values(cls, width: int, height: int) -> List[int]:
+        """Point values to place on a `width` x `height` board.
+
+        One copy of POINT_VALUES per POINT_AREA cells (rounded, at least one),
+        so the density of point cells stays that of the 8x8 game: 10 cells on
+        8x8, 40 on 16x16, 160 on 32x32.
+        """
+        copies = max(1, round(width * height / cls.POINT_AREA))
+        return cls.POINT_VALUES * copies
 
     def initialize(self, width: int = 8, height: int = 8, player_ids: Optional[List[str]] = None, seed: Optional[int] = None) -> None:
-        """Initialize a new game: create an 8x8 board (by default), place 10 point cells and two horses.
+        """Initialize a new game: create an 8x8 board (by default), place the point cells and two horses.
 
-        Horses are placed on random cells that do not contain the point cells. Seed can be provided for reproducibility.
+        The point cells are `point_values(width, height)`: the 10 POINT_VALUES
+        on 8x8 and proportionally more on larger boards. Horses are placed on
+        random cells that do not contain the point cells. Seed can be provided for reproducibility.
         El juego siempre lo inicia P1 (la máquina con el caballo blanco).
         """
         if player_ids is None:
             player_ids = ["P1", "P2"]
         rnd = random.Random(seed)
         # generate point cells
-        points = create_random_point_cells(width, height, Game.POINT_VALUES, seed)
+        points = create_random_point_cells(width, height, Game.point_values(width, height), seed)
         board = Board(width, height, points)
         # choose free cells for horses
         all_cells = [(x, y) for y in range(height) for x in range(width)]
@@ -166,20 +229,88 @@ class Game:
         # El juego siempre inicia con P1 (la máquina/caballo blanco)
         self.turn = "P1"
         self.scores = {pid: 0 for pid in player_ids}
+        self.log = GameRecord.from_game(self) if GameRecord.supports(width, height) else None
+        self._history = []
+        self._touch()
+
+    def copy(self) -> 'Game':
+        """Independent copy of the position, its log and its undo history.
+
+        Much cheaper than `copy.deepcopy`: only the mutable state (points,
+        blocked cells, horses, scores, log) is copied, the board tables are
+        shared and the memoized queries are rebuilt on demand. The log copy
+        is not attached to a file.
+        """
+        other = Game()
+        other.board = self.board.copy() if self.board is not None else None
+        other.horses = {hid: Horse(h.id, h.owner, h.pos) for hid, h in self.horses.items()}
+        other.turn = self.turn
+        other.scores = dict(self.scores)
+        other.version = self.version
+        other.log = self.log.copy() if self.log is not None else None
+        other._history = list(self._history)
+        return other
+
+    def _touch(self) -> None:
+        """Mark the position as changed, invalidating the memoized queries."""
+        self.version += 1
+
+    def _cache(self) -> Dict[object, object]:
+        key = (self.version, self.board.version if self.board is not None else 0)
+        if key != self._memo_key:
+            self._memo_key = key
+            self._memo = {}
+        return self._memo
+
+    def _occupied(self) -> Dict[Position, str]:
+        cache = self._cache()
+        occ = cache.get("occupied")
+        if occ is None:
+            occ = cache["occupied"] = {h.pos: hid for hid, h in self.horses.items()}
+        return occ
 
     def occupied_positions(self) -> Dict[Position, str]:
-        return {h.pos: hid for hid, h in self.horses.items()}
+        return dict(self._occupied())
 
     def generate_moves_for_player(self, player: str) -> List[Tuple[str, Position]]:
-        """Return a list of (horse_id, destination) legal moves for `player`."""
-        occ = set(self.occupied_positions().keys())
-        moves: List[Tuple[str, Position]] = []
-        for hid, h in self.horses.items():
+        """Return a list of (horse_id, destination) legal moves for `player`.
+
+        The list is a copy of the memoized one, so callers may modify it.
+        """
+        cache = self._cache()
+        moves = cache.get(("moves", player))
+        if moves is None:
+            occ = self._occupied()
+            moves = []
+            for hid, h in self.horses.items():
+                if h.owner != player:
+                    continue
+                for to in h.possible_moves(self.board, occ):
+                    moves.append((hid, to))
+            cache[("moves", player)] = moves
+        return list(moves)
+
+    def has_moves(self, player: str) -> bool:
+        """Whether `player` has at least one legal move (stops at the first one)."""
+        cache = self._cache()
+        moves = cache.get(("moves", player))
+        if moves is not None:
+            return bool(moves)
+        found = cache.get(("has_moves", player))
+        if found is not None:
+            return found
+        occ = self._occupied()
+        blocked = self.board.blocked
+        neighbors = self.board.neighbors
+        found = False
+        for h in self.horses.values():
             if h.owner != player:
                 continue
-            for to in h.possible_moves(self.board, occ):
-                moves.append((hid, to))
-        return moves
+            if any(to not in occ and to not in blocked for to in neighbors[h.pos]):
+                found = True
+                break
+        cache[("has_moves", player)] = found
+        return found
 
     def apply_move(self, horse_id: str, to: Position) -> int:
         """Apply a move for horse `horse_id` to position `to`.
@@ -188,30 +319,111 @@ class Game:
         """
         if horse_id not in self.horses:
             raise ValueError("Invalid horse id")
-        horse = self.horses[horse_id]
-        occ = set(self.occupied_positions().keys())
-        if to in occ:
+        if not self.board.in_bounds(to):
+            raise ValueError("Destination out of bounds")
+        if to in self._occupied():
             raise ValueError("Destination occupied")
         if self.board.is_blocked(to):
             raise ValueError("Destination blocked")
-        
-        # Perform move via horse
-        pts = horse.move_and_collect(to, self.board)
-        
-        # Add to score
-        self.scores[horse.owner] = self.scores.get(horse.owner, 0) + pts
-        
-        # Switch turn
-        self._switch_turn()
-        
+
+        undo = self.make_move(horse_id, to)
+        pts = undo[3] or 0
+        self._record(undo, pts)
         return pts
 
+    def apply_pass(self) -> int:
+        """Pass the turn of a player with no legal moves (while the game goes on).
+
+        The player loses PASS_PENALTY points, as in the GUI rules. Returns the
+        points applied (negative).
+        """
+        penalty = -Game.PASS_PENALTY
+        self.scores[self.turn] = self.scores.get(self.turn, 0) + penalty
+        self._record(self.make_pass(), penalty)
+        return penalty
+
+    def _record(self, undo: MoveUndo, points: int) -> None:
+        self._history.append((undo, points))
+        if self.log is not None:
+            if undo[0] is None:
+                self.log.append_pass(points)
+            else:
+                self.log.append_move(undo[0], undo[2], points)
+
+    def undo_move(self) -> None:
+        """Take back the last `apply_move` or `apply_pass` (score included).
+
+        Raises ValueError if there is nothing to undo.
+        """
+        if not self._history:
+            raise ValueError("No moves to undo")
+        undo, points = self._history.pop()
+        if self.log is not None:
+            self.log.pop()
+        self.unmake_move(undo)
+        if undo[0] is None:
+            self.scores[undo[5]] -= points
+
+    def make_move(self, horse_id: str, to: Position) -> MoveUndo:
+        """Apply a move in place and return a compact undo record.
+
+        This is the fast path used by the search: no validation is done, so
+        `to` must come from `generate_moves_for_player`. The returned record
+        restores the exact previous state when passed to `unmake_move`.
+        """
+        horse = self.horses[horse_id]
+        board = self.board
+        frm = horse.pos
+        removed = None
+        index = -1
+        if to in board.points:
+            # remember where the cell was so unmake keeps the dict order intact
+            index = list(board.points).index(to)
+            removed = board.points.pop(to)
+        board.blocked.add(to)
+        horse.pos = to
+        if removed:
+            self.scores[horse.owner] = self.scores.get(horse.owner, 0) + removed
+        prev_turn = self.turn
+        self._switch_turn()
+        return (horse_id, frm, to, removed, index, prev_turn)
+
+    def make_pass(self) -> MoveUndo:
+        """Pass the turn in place (no legal moves) and return an undo record."""
+        prev_turn = self.turn
+        self._switch_turn()
+        return (None, None, None, None, -1, prev_turn)
+
+    def unmake_move(self, undo: MoveUndo) -> None:
+        """Revert a move or pass previously returned by `make_move`/`make_pass`."""
+        horse_id, frm, to, removed, index, prev_turn = undo
+        self.turn = prev_turn
+        self._touch()
+        if horse_id is None:
+            return
+        horse = self.horses[horse_id]
+        board = self.board
+        horse.pos = frm
+        board.blocked.discard(to)
+        if removed is not None:
+            points = board.points
+            if index == len(points):
+                points[to] = removed
+            else:
+                items = list(points.items())
+                items.insert(index, (to, removed))
+                points.clear()
+                points.update(items)
+            if removed:
+                self.scores[horse.owner] -= removed
+
     def _switch_turn(self) -> None:
         """Switch to the next player's turn.
         
         If the current player has no legal moves, they receive a -4 point penalty
         before the turn switches.
         """
+        self._touch()
         players = sorted(list({h.owner for h in self.horses.values()}))
         if not players:
             self.turn = None
@@ -242,6 +454,13 @@ class Game:
             - reason: String describing why game ended
             - winner_id: Player ID of winner, or None for draw/no winner
         """
+        cache = self._cache()
+        result = cache.get("game_over")
+        if result is None:
+            result = cache["game_over"] = self._game_over_status()
+        return result
+
+    def _game_over_status(self) -> Tuple[bool, str, Optional[str]]:
         players = sorted(list({h.owner for h in self.horses.values()}))
         
         # No horses left - shouldn't happen in normal gameplay
@@ -253,9 +472,7 @@ class Game:
             return True, "Jugador oponente eliminado", players[0]
         
         # Check if both players have no legal moves
-        player_moves = {p: len(self.generate_moves_for_player(p)) for p in players}
-        
-        if all(v == 0 for v in player_moves.values()):
+        if not any(self.has_moves(p) for p in players):
             # La penalización de -4 ya se aplicó en la GUI cuando cada jugador se quedó sin movimientos
             # Solo determinamos el ganador por puntuación
             p_sorted = sorted(self.scores.items(), key=lambda kv: kv[1], reverse=True)
@@ -286,8 +503,8 @@ class Game:
             cur = self.turn
             moves = self.generate_moves_for_player(cur)
             if not moves:
-                # no moves for current player -> switch turn
-                self._switch_turn()
+                # no moves for current player -> switch turn (logged as a pass without penalty)
+                self._record(self.make_pass(), 0)
                 steps += 1
                 continue
             # pick a move; for some variation shuffle available moves
@@ -305,126 +522,840 @@ class Game:
 
 
 class AIPlayer:
-    """IA que usa algoritmo Minimax con heurística para jugar Smart Horses."""
+    """IA que usa algoritmo Minimax con heurística para jugar Smart Horses.
+
+    La búsqueda trabaja sobre un `BitboardState` (ver `bitboard.py`) creado a
+    partir del juego al inicio de cada llamada; el `Game` recibido nunca se
+    modifica.
+    """
+    
+    # Límite de profundidad cuando solo se fija un presupuesto de tiempo/nodos
+    MAX_DEPTH = 64
+    # Cada cuántos nodos se consulta el reloj
+    CHECK_EVERY = 1024
+    DEFAULT_WEIGHTS = (1.0, 0.5, 0.3)
+    # Las iteraciones menos profundas no compensan el coste de repartirlas
+    PARALLEL_MIN_DEPTH = 4
+    # Margen con el que los procesos usan el alfa compartido (ver `_search_root_parallel`)
+    PARALLEL_EPSILON = 1e-9
+    # Casillas alcanzables a partir de las cuales se resuelve el final exacto
+    ENDGAME_CELLS = 20
+    # Con menos plies por delante las cotas cuestan más que las hojas que ahorran
+    BOUND_MIN_DEPTH = 2
+    # Ventana nula de PVS: (alfa, alfa + SCOUT_WINDOW)
+    SCOUT_WINDOW = 1e-9
+    # Semiancho de la ventana de aspiración alrededor del valor de dos iteraciones antes
+    ASPIRATION_WINDOW = 1.0
+    # En las iteraciones cortas repetir la raíz cuesta más de lo que ahorra
+    ASPIRATION_MIN_DEPTH = 7
+    # Segundos mínimos entre avisos de progreso dentro de una misma iteración
+    PROGRESS_INTERVAL = 0.1
+    # Profundidad con la que se guardan en la tabla los subárboles resueltos
+    # hasta el final de la partida (su valor sirve a cualquier profundidad)
+    RESOLVED_DEPTH = 1 << 10
     
-    def __init__(self, player_id: str, depth: int = 2):
+    def __init__(self, player_id: str, depth: Optional[int] = 2, use_tt: bool = True,
+                 tt_entries: Optional[int] = None, tt_mb: Optional[float] = None,
+                 time_limit: Optional[float] = None, node_limit: Optional[int] = None,
+                 move_orderer: Optional[MoveOrderer] = None, blocked_distances: bool = False,
+                 workers: int = 1, weights: Optional[Tuple[float, float, float]] = None,
+                 stats: Optional[SearchStats] = None, endgame_cells: Optional[int] = None,
+                 bound_pruning: bool = True, reuse_search: bool = True):
         self.player_id = player_id
+        # Profundidad máxima; None = sin tope (solo limitan tiempo/nodos)
         self.depth = depth
+        self.time_limit = time_limit
+        self.node_limit = node_limit
         self.opponent_id = "P2" if player_id == "P1" else "P1"
+        self.side = 0
+        self.opponent_side = 1
+        # Tabla de transposiciones (None la desactiva); ver `tt.stats()`
+        self.tt: Optional[TranspositionTable] = TranspositionTable(tt_entries, tt_mb) if use_tt else None
+        # Ordenación de movimientos; ver `move_orderer.stats()`
+        self.move_orderer: MoveOrderer = move_orderer if move_orderer is not None else HeuristicMoveOrderer()
+        # Distancias de caballo que evitan las casillas bloqueadas (más caras)
+        self.blocked_distances = blocked_distances
+        # Pesos de (puntuación, movilidad, proximidad) en la heurística
+        self.weights: Tuple[float, float, float] = tuple(weights) if weights is not None else self.DEFAULT_WEIGHTS
+        # Procesos para repartir los movimientos de la raíz (1 = secuencial)
+        self.workers = workers
+        # Instrumentación opcional de la búsqueda (ver `SearchStats`)
+        self.stats = stats
+        # Resolución exacta del final (0 la desactiva); ver `endgame.py`
+        self.endgame_cells = endgame_cells if endgame_cells is not None else self.ENDGAME_CELLS
+        self.endgame = EndgameSolver(Game.PASS_PENALTY)
+        # Poda por cotas de lo que aún se puede ganar (ver `_value_bounds`)
+        self.bound_pruning = bound_pruning
+        # Conservar tabla, killers, historia y variante entre jugadas (ver `_prepare_context`)
+        self.reuse_search = reuse_search
+        # (tamaño, valores de las casillas, bloqueadas) de la última búsqueda
+        self._context: Optional[Tuple[int, List[int], int]] = None
+        # (hash, resto de la variante) de la posición prevista para la siguiente
+        self._expected: Optional[Tuple[int, List[Optional[BitMove]]]] = None
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._shared_alpha = None
+        self._search_count = 0
+        # Solo los procesos auxiliares exigen profundidad exacta en la tabla
+        self._tt_exact_depth = False
+        # Resultado de la última búsqueda
+        self.nodes = 0
+        self.bound_cutoffs = 0
+        self.completed_depth = 0
+        self.last_value: Optional[float] = None
+        self.last_elapsed = 0.0
+        # Variante principal de la última iteración completa (None = pase)
+        self.principal_variation: List[Optional[Tuple[str, Position]]] = []
+        # Búsquedas de la raíz repetidas por salirse de la ventana de aspiración
+        self.aspiration_researches = 0
+        self._pv: List[List[Optional[BitMove]]] = []
+        self._iteration_values: Dict[int, float] = {}
+        # "win"/"draw"/"loss" y margen final si la última jugada salió del solucionador
+        self.proven: Optional[str] = None
+        self.proven_margin: Optional[int] = None
+        self._deadline: Optional[float] = None
+        self._node_budget: Optional[int] = None
+        self._cancel: Optional[threading.Event] = None
+        self._progress: Optional[Callable[[Dict[str, object]], None]] = None
+        self._search_start = 0.0
+        self._last_progress = 0.0
+        self._can_abort = False
+        self._horizon_reached = False
+        self._root_depth = 0
+        self._ai_horse: Optional[int] = None
+        self._opponent_horse: Optional[int] = None
+        self._gain_cache: Dict[Tuple[int, int, int], Tuple[int, int]] = {}
+        self._proximity_cache: Dict[Tuple[int, int, int, int], Tuple[float, float]] = {}
+        self._mobility_bounds = (0.0, 0.0)
     
-    def get_best_move(self, game: Game) -> Optional[Tuple[str, Position]]:
-        """Obtiene el mejor movimiento usando Minimax."""
-        moves = game.generate_moves_for_player(self.player_id)
-        if not moves:
+    def get_best_move(self, game: Game, time_limit: Optional[float] = None,
+                      node_limit: Optional[int] = None, cancel: Optional[threading.Event] = None,
+                      progress: Optional[Callable[[Dict[str, object]], None]] = None
+                      ) -> Optional[Tuple[str, Position]]:
+        """Obtiene el mejor movimiento usando Minimax con profundización iterativa.
+
+        Se busca a profundidad 1, 2, ... hasta `self.depth`, hasta agotar el
+        tiempo (`time_limit`, en segundos) o los nodos (`node_limit`), o hasta
+        que el árbol completo quede resuelto. Se devuelve el mejor movimiento de
+        la última iteración completa; cada iteración ordena los movimientos de
+        la raíz según los valores de la anterior, busca con una ventana de
+        aspiración alrededor de su valor y reutiliza la tabla de
+        transposiciones para probar primero la mejor jugada conocida.
+        Sin límites explícitos se usan los del constructor. La variante
+        principal queda en `principal_variation` (ver `get_best_line`).
+
+        Si se activa `cancel` desde otro hilo la búsqueda se corta en cuanto
+        se consulta el reloj, incluso en la primera iteración; la jugada
+        devuelta entonces no es fiable y el llamador debe descartarla.
+
+        `progress`, si se da, recibe un dict con `depth` (última iteración
+        completa), `move`, `value`, `pv`, `nodes`, `elapsed` y `proven` al
+        acabar cada iteración y, durante las largas, cada
+        `PROGRESS_INTERVAL` segundos. Se llama desde el hilo de la búsqueda.
+        """
+        if not game.generate_moves_for_player(self.player_id):
             return None
+        if time_limit is None:
+            time_limit = self.time_limit
+        if node_limit is None:
+            node_limit = self.node_limit
         
-        best_move = None
+        start = time.perf_counter()
+        self._search_start = self._last_progress = start
+        self._progress = progress
+        state = BitboardState.from_game(game, KNIGHT_DELTAS)
+        self.side = state.side_of(self.player_id)
+        self.opponent_side = state.side_of(self.opponent_id)
+        # La búsqueda siempre empieza con la IA moviendo
+        state.set_turn(self.side)
+        self.proven = None
+        self.proven_margin = None
+        self.principal_variation = []
+        if self.endgame_cells:
+            if popcount(reachable_cells(state)) <= self.endgame_cells:
+                solved = self.endgame.solve(state)
+            else:
+                # regiones ya separadas: cada lado se resuelve por su cuenta
+                solved = self.endgame.solve_split(state)
+            if solved is not None:
+                return self._solve_endgame(state, solved, start)
+        self._track_evaluation(state)
+        self._prepare_context(state)
+        self._search_count += 1
+        self.nodes = 0
+        self.bound_cutoffs = 0
+        self.aspiration_researches = 0
+        self.completed_depth = 0
+        self.last_value = None
+        self._iteration_values = {}
+        self._deadline = start + time_limit if time_limit is not None else None
+        self._node_budget = node_limit
+        self._cancel = cancel
+        # La primera iteración siempre se completa para tener una jugada
+        self._can_abort = False
+        
+        stats = self.stats
+        if stats is not None:
+            stats.begin_search(self, state)
+        try:
+            root_moves = state.generate_moves(self.side)
+            hint = self._root_hint(state)
+            if hint in root_moves:
+                root_moves.remove(hint)
+                root_moves.insert(0, hint)
+            max_depth = self.depth if self.depth is not None else self.MAX_DEPTH
+            best_move = root_moves[0]
+            line: List[Optional[BitMove]] = []
+            for depth in range(1, max_depth + 1):
+                self._horizon_reached = False
+                parallel = self.workers > 1 and depth >= self.PARALLEL_MIN_DEPTH and len(root_moves) > 1
+                try:
+                    if parallel:
+                        move, value, scores = self._search_root_parallel(state, root_moves, depth)
+                    else:
+                        move, value, scores = self._search_aspiration(state, root_moves, depth)
+                except SearchAborted:
+                    if stats is not None:
+                        stats.end_iteration(depth, self.nodes, completed=False)
+                    break
+                if stats is not None:
+                    stats.end_iteration(depth, self.nodes, completed=True)
+                best_move = move
+                self.completed_depth = depth
+                self.last_value = value
+                self._iteration_values[depth] = value
+                line = list(self._pv[0])
+                self.principal_variation = [state.to_game_move(m) if m is not None else None
+                                            for m in line]
+                self._can_abort = True
+                if progress is not None:
+                    self._report_progress()
+                # La mejor jugada primero y el resto según su valor previo. En
+                # paralelo los valores que no superan al mejor son cotas que
+                # dependen del reparto, así que se conserva el orden anterior
+                # para que el resultado sea determinista.
+                if not parallel:
+                    root_moves.sort(key=lambda m: -scores[m])
+                root_moves.remove(move)
+                root_moves.insert(0, move)
+                if not self._horizon_reached:
+                    break  # el árbol completo ya se resolvió
+        finally:
+            if stats is not None:
+                stats.end_search(self)
+        
+        if self.reuse_search:
+            self._remember_line(game, line)
+        self.last_elapsed = time.perf_counter() - start
+        return state.to_game_move(best_move)
+    
+    def reset(self) -> None:
+        """Olvida todo lo aprendido en búsquedas anteriores (p. ej. al empezar
+        otra partida con la misma IA)."""
+        if self.tt is not None:
+            self.tt.clear()
+        self.move_orderer.new_search()
+        self.endgame.clear()
+        self._context = None
+        self._expected = None
+    
+    def _prepare_context(self, state: BitboardState) -> None:
+        """Decide si la búsqueda parte de lo aprendido en la anterior.
+
+        Se reutiliza (tabla, killers e historia) mientras sea la misma
+        partida: mismo tablero y mismos valores en las casillas con puntos que
+        quedan, como en `EndgameSolver`. Las entradas de la tabla con menos
+        casillas bloqueadas que la raíz ya no pueden repetirse y pasan a ser
+        las primeras en reemplazarse.
+        """
+        blocked = popcount(state.blocked)
+        context = self._context
+        if (context is None or context[0] != state.tables.size
+                or any(context[1][sq] != state.values[sq] for sq in iter_bits(state.positive | state.negative))):
+            self.reset()
+        elif not self.reuse_search:
+            if self.tt is not None:
+                self.tt.clear()
+            self.move_orderer.new_search()
+        else:
+            # jugadas desde la búsqueda anterior (los pases no bloquean casillas)
+            self.move_orderer.carry_over(state, max(0, blocked - context[2]))
+        self._context = (state.tables.size, list(state.values), blocked)
+        if self.tt is not None:
+            self.tt.reset_counters()
+            self.tt.age(blocked)
+    
+    def _root_hint(self, state: BitboardState) -> Optional[BitMove]:
+        """Jugada de la raíz que se prueba primero en la primera iteración:
+        la que seguía en la variante principal anterior si el rival jugó lo
+        previsto, o si no la mejor de la tabla para esta posición."""
+        expected = self._expected
+        if expected is not None and expected[0] == state.hash and expected[1]:
+            return expected[1][0]
+        if self.tt is not None:
+            entry = self.tt.probe(state.hash)
+            if entry is not None:
+                return entry[4]
+        return None
+    
+    def _remember_line(self, game: Game, line: List[Optional[BitMove]]) -> None:
+        """Alarga la variante principal con las jugadas de la tabla (los cortes
+        por la tabla la dejan a medias) y guarda la posición que se espera
+        tras la jugada de la IA y la respuesta prevista."""
+        state = BitboardState.from_game(game, KNIGHT_DELTAS)
+        state.set_turn(self.side)
+        hashes = [state.hash]
+        for move in line:
+            if move is None:
+                state.make_pass()
+            else:
+                state.make(move)
+            hashes.append(state.hash)
+        line = list(line)
+        while self.tt is not None and line and len(line) < self.completed_depth and not state.is_terminal():
+            moves = state.generate_moves(state.turn)
+            if moves:
+                entry = self.tt.probe(state.hash)
+                if entry is None or entry[4] not in moves:
+                    break
+                state.make(entry[4])
+                line.append(entry[4])
+            else:
+                state.make_pass()
+                line.append(None)
+            hashes.append(state.hash)
+        self.principal_variation = [state.to_game_move(m) if m is not None else None for m in line]
+        self._expected = (hashes[2], line[2:]) if len(line) >= 2 else None
+    
+    def _solve_endgame(self, state: BitboardState, solved: Tuple[BitMove, int],
+                       start: float) -> Optional[Tuple[str, Position]]:
+        """Juega la jugada del solucionador exacto en lugar de la heurística.
+
+        Deja en `proven` el resultado demostrado y en `proven_margin` (y en
+        `last_value`) el margen final de puntos con juego perfecto.
+        """
+        move, future = solved
+        margin = state.scores[self.side] - state.scores[self.opponent_side] + future
+        self.proven = outcome(margin)
+        self.proven_margin = margin
+        self.nodes = self.endgame.nodes
+        self.completed_depth = 0
+        self.last_value = float(margin)
+        self.principal_variation = [state.to_game_move(move)]
+        self.last_elapsed = time.perf_counter() - start
+        if self._progress is not None:
+            self._report_progress()
+        return state.to_game_move(move)
+    
+    def _report_progress(self) -> None:
+        now = time.perf_counter()
+        self._last_progress = now
+        self._progress({
+            "depth": self.completed_depth,
+            "move": self.principal_variation[0] if self.principal_variation else None,
+            "value": self.last_value,
+            "pv": list(self.principal_variation),
+            "nodes": self.nodes,
+            "elapsed": now - self._search_start,
+            "proven": self.proven,
+        })
+    
+    def get_best_line(self, game: Game, time_limit: Optional[float] = None,
+                      node_limit: Optional[int] = None, cancel: Optional[threading.Event] = None,
+                      progress: Optional[Callable[[Dict[str, object]], None]] = None
+                      ) -> Tuple[Optional[Tuple[str, Position]], List[Optional[Tuple[str, Position]]]]:
+        """Como `get_best_move`, devolviendo también la variante principal.
+
+        La variante empieza por la jugada elegida y alterna los dos lados;
+        los pases aparecen como None.
+        """
+        move = self.get_best_move(game, time_limit, node_limit, cancel, progress)
+        return move, list(self.principal_variation)
+    
+    def _search_aspiration(self, state: BitboardState, moves: List[BitMove], depth: int) -> Tuple[BitMove, float, Dict[BitMove, float]]:
+        """`_search_root` con una ventana alrededor del valor de `depth - 2`.
+
+        Se usa la iteración de la misma paridad porque los valores oscilan
+        entre profundidades pares e impares. Si el resultado cae fuera de (valor - ASPIRATION_WINDOW, valor +
+        ASPIRATION_WINDOW) solo es una cota, así que se repite abriendo del
+        todo el lado por el que se salió.
+        """
+        guess = self._iteration_values.get(depth - 2)
+        if guess is None or depth < self.ASPIRATION_MIN_DEPTH:
+            return self._search_root(state, moves, depth)
+        alpha = guess - self.ASPIRATION_WINDOW
+        beta = guess + self.ASPIRATION_WINDOW
+        while True:
+            move, value, scores = self._search_root(state, moves, depth, alpha, beta)
+            if value <= alpha:
+                alpha = -math.inf
+            elif value >= beta:
+                beta = math.inf
+            else:
+                return move, value, scores
+            self.aspiration_researches += 1
+    
+    def _search_root(self, state: BitboardState, moves: List[BitMove], depth: int,
+                     alpha: float = -math.inf, beta: float = math.inf) -> Tuple[BitMove, float, Dict[BitMove, float]]:
+        """Una iteración a profundidad `depth` sobre los movimientos de la raíz.
+
+        El primer movimiento se busca con la ventana completa y el resto con
+        ventana nula (ver `_negamax`). A igual valor gana el que va antes.
+        """
+        self._root_depth = depth
+        self._pv = [[] for _ in range(depth + 1)]
+        best_move = moves[0]
         best_value = -math.inf
+        scores: Dict[BitMove, float] = {}
+        for index, move in enumerate(moves):
+            undo = state.make(move)
+            if index == 0 or depth == 1:
+                value = -self._negamax(state, depth - 1, -beta, -alpha)
+            else:
+                scout_beta = alpha + self.SCOUT_WINDOW
+                value = -self._negamax(state, depth - 1, -scout_beta, -alpha)
+                if alpha < value < beta and scout_beta < beta:
+                    value = -self._negamax(state, depth - 1, -beta, -alpha)
+            state.unmake(undo)
+            scores[move] = value
+            if value > best_value:
+                best_value = value
+                best_move = move
+            if value > alpha:
+                alpha = value
+                self._pv[0] = [move] + self._pv[1]
+            if alpha >= beta:
+                break
+        return best_move, best_value, scores
+    
+    def _search_root_parallel(self, state: BitboardState, moves: List[BitMove], depth: int) -> Tuple[BitMove, float, Dict[BitMove, float]]:
+        """Como `_search_root`, repartiendo la raíz entre `self.workers` procesos.
+
+        Se sigue el esquema "young brothers wait": el primer movimiento (el
+        mejor de la iteración anterior) se busca aquí con ventana completa y su
+        valor inicia un alfa compartido; el resto se reparte en el pool. Cada
+        tarea lee el alfa compartido al empezar y lo sube si encuentra algo
+        mejor. Para que la elección no dependa del reparto, las tareas buscan
+        con `alfa - PARALLEL_EPSILON`: todo movimiento que empate o supere al
+        mejor vuelve con su valor exacto y los empates se resuelven por orden
+        en la raíz. Los valores que no alcanzan al mejor son solo cotas.
+        """
+        self._root_depth = depth
+        self._pv = [[] for _ in range(depth + 1)]
+        first = moves[0]
+        undo = state.make(first)
+        best_value = -self._negamax(state, depth - 1, -math.inf, math.inf)
+        state.unmake(undo)
+        self._pv[0] = [first] + self._pv[1]
+        scores: Dict[BitMove, float] = {first: best_value}
         
-        for move in moves:
-            # Crear copia del juego para simular el movimiento
-            game_copy = self._copy_game(game)
-            try:
-                game_copy.apply_move(move[0], move[1])
-                value = self._minimax(game_copy, self.depth - 1, False, -math.inf, math.inf)
-                if value > best_value:
-                    best_value = value
-                    best_move = move
-            except ValueError:
-                continue
+        pool = self._get_pool()
+        self._shared_alpha.value = best_value
+        # un único instante absoluto para todas las tareas: las que esperan en
+        # la cola no vuelven a recibir el tiempo entero
+        deadline = None
+        if self._deadline is not None:
+            deadline = time.monotonic() + (self._deadline - time.perf_counter())
+        node_budget = None
+        if self._node_budget is not None:
+            node_budget = max(0, self._node_budget - self.nodes) // (len(moves) - 1)
+        config = self._worker_config()
+        search_id = (id(self), self._search_count)
+        futures = [pool.submit(_root_move_task, search_id, config, state, move, depth, deadline, node_budget)
+                   for move in moves[1:]]
+        results = [f.result() for f in futures]
         
-        return best_move
+        best_move = first
+        for move, result in zip(moves[1:], results):
+            if result is None:
+                raise SearchAborted()
+            value, nodes, horizon = result
+            self.nodes += nodes
+            self._horizon_reached = self._horizon_reached or horizon
+            scores[move] = value
+            # estricto: a igual valor gana el que va antes en la raíz
+            if value > best_value:
+                best_value = value
+                best_move = move
+                # la continuación se quedó en el proceso auxiliar
+                self._pv[0] = [move]
+        return best_move, best_value, scores
+    
+    def _worker_config(self) -> Dict[str, object]:
+        return {
+            "player_id": self.player_id,
+            "use_tt": self.tt is not None,
+            "tt_entries": self.tt.capacity if self.tt is not None else None,
+            "orderer": type(self.move_orderer),
+            "blocked_distances": self.blocked_distances,
+            "weights": self.weights,
+        }
+    
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._shared_alpha = pool_context().Value("d", -math.inf)
+            self._pool = process_pool(self.workers, _init_root_worker, (self._shared_alpha,))
+        return self._pool
+    
+    def close(self) -> None:
+        """Cierra el pool de procesos del modo paralelo, si se creó."""
+        if self._pool is not None:
+            self._pool.shutdown(wait=False)
+            self._pool = None
+            self._shared_alpha = None
     
-    def _minimax(self, game: Game, depth: int, is_maximizing: bool, alpha: float, beta: float) -> float:
-        """Algoritmo Minimax con poda alfa-beta."""
-        # Caso base: profundidad 0 o juego terminado
-        is_over, reason, winner = game.is_game_over()
-        if depth == 0 or is_over:
-            return self._evaluate_position(game)
+    def _search_root_move(self, state: BitboardState, move: BitMove, depth: int,
+                          deadline: Optional[float], node_budget: Optional[int],
+                          shared_alpha) -> Optional[Tuple[float, int, bool]]:
+        """Tarea de un proceso auxiliar: busca un movimiento de la raíz.
+
+        `deadline` es un instante de `time.monotonic()` (el reloj es común a
+        todos los procesos). Devuelve (valor, nodos, alcanzó_horizonte) o None
+        si se agotó el presupuesto.
+        """
+        self.side = state.side_of(self.player_id)
+        self.opponent_side = state.side_of(self.opponent_id)
+        self._track_evaluation(state)
+        self.nodes = 0
+        self._root_depth = depth
+        self._pv = [[] for _ in range(depth + 1)]
+        self._horizon_reached = False
+        self._deadline = None
+        if deadline is not None:
+            self._deadline = time.perf_counter() + (deadline - time.monotonic())
+        self._node_budget = node_budget
+        self._can_abort = True
+        alpha = shared_alpha.value - self.PARALLEL_EPSILON
+        try:
+            # una tarea que sale de la cola ya fuera de tiempo no llega a buscar
+            self._check_limits()
+            undo = state.make(move)
+            value = -self._negamax(state, depth - 1, -math.inf, -alpha)
+        except SearchAborted:
+            return None
+        state.unmake(undo)
+        with shared_alpha.get_lock():
+            if value > shared_alpha.value:
+                shared_alpha.value = value
+        return value, self.nodes, self._horizon_reached
+    
+    def _check_limits(self) -> None:
+        """Aborta la iteración en curso si se agotó el presupuesto."""
+        if self._cancel is not None and self._cancel.is_set():
+            raise SearchAborted()
+        if self._progress is not None and time.perf_counter() - self._last_progress >= self.PROGRESS_INTERVAL:
+            self._report_progress()
+        if not self._can_abort:
+            return
+        if self._node_budget is not None and self.nodes >= self._node_budget:
+            raise SearchAborted()
+        if self._deadline is not None and time.perf_counter() >= self._deadline:
+            raise SearchAborted()
+    
+    def _negamax(self, state: BitboardState, depth: int, alpha: float, beta: float) -> float:
+        """Negamax con poda alfa-beta, PVS y tabla de transposiciones.
+
+        Devuelve el valor para el lado que mueve: `_evaluate_position` (que
+        siempre puntúa desde la IA) con el signo del turno. Tras el primer
+        movimiento, cada hermano se prueba con una ventana nula (alfa, alfa +
+        SCOUT_WINDOW), que solo dice si lo mejora; si lo mejora se vuelve a
+        buscar con la ventana completa. La variante principal desde este nodo
+        queda en `self._pv[ply]`.
+
+        Modifica `state` en sitio y lo deja exactamente como lo recibió (salvo
+        si se lanza `SearchAborted`, en cuyo caso el estado se descarta).
+        Los valores se guardan en la tabla sin la diferencia de puntuación
+        actual: el resto de la evaluación solo depende de la posición, así que
+        dos órdenes de jugadas que recogen los mismos puntos con distinto
+        caballo comparten la misma entrada.
+        """
+        self.nodes += 1
+        if self.nodes % self.CHECK_EVERY == 0 or self._node_budget is not None:
+            self._check_limits()
+        ply = self._root_depth - depth
+        pv = self._pv
+        pv[ply] = []
+        maximizing = state.turn == self.side
+        
+        # Caso base: profundidad 0 o juego terminado (la movilidad calculada
+        # aquí sirve para ambas cosas)
+        ai_moves = state.mobility(self.side)
+        opponent_moves = state.mobility(self.opponent_side)
+        if ai_moves == 0 and opponent_moves == 0:
+            value = self._evaluate_position(state, ai_moves, opponent_moves)
+            return value if maximizing else -value
+        if depth == 0:
+            self._horizon_reached = True
+            value = self._evaluate_position(state, ai_moves, opponent_moves)
+            return value if maximizing else -value
+        
+        # Ni la mejor ni la peor hoja posible del subárbol caen dentro de la ventana
+        if self.bound_pruning and depth >= self.BOUND_MIN_DEPTH:
+            lower, upper = self._value_bounds(state, depth, maximizing)
+            if not maximizing:
+                lower, upper = -upper, -lower
+            if upper <= alpha:
+                self.bound_cutoffs += 1
+                self._horizon_reached = True
+                return upper
+            if lower >= beta:
+                self.bound_cutoffs += 1
+                self._horizon_reached = True
+                return lower
         
+        tt = self.tt
+        tt_move = None
+        if tt is not None:
+            # la tabla guarda el valor sin la parte de la puntuación ya acumulada
+            # (lineal en ella con peso `w_score`), así sirve desde cualquier marcador
+            score_shift = self.weights[0] * (state.scores[state.turn] - state.scores[1 - state.turn])
+            entry = tt.probe(state.hash)
+            if entry is not None:
+                tt_move = entry[4]
+                if entry[1] == depth or (entry[1] > depth and not self._tt_exact_depth):
+                    flag = entry[2]
+                    value = entry[3] + score_shift
+                    if flag == EXACT or (flag == LOWER and value >= beta) or (flag == UPPER and value <= alpha):
+                        tt.cutoffs += 1
+                        if entry[1] != self.RESOLVED_DEPTH:
+                            self._horizon_reached = True
+                        return value
+            alpha_orig = alpha
+            # si ningún descendiente llega al horizonte, el valor vale a cualquier profundidad
+            outer_horizon = self._horizon_reached
+            self._horizon_reached = False
+        
+        moves = state.generate_moves(state.turn)
+        moves = self.move_orderer.order(state, moves, ply, tt_move)
+        
+        best_move = None
+        if not moves:  # No hay movimientos, cambiar turno
+            undo = state.make_pass()
+            best_value = -self._negamax(state, depth - 1, -beta, -alpha)
+            state.unmake(undo)
+            pv[ply] = [None] + pv[ply + 1]
+        else:
+            best_value = -math.inf
+            for index, move in enumerate(moves):
+                undo = state.make(move)
+                if index == 0 or depth == 1:
+                    # con hojas como hijos la ventana nula no ahorra nada
+                    score = -self._negamax(state, depth - 1, -beta, -alpha)
+                else:
+                    scout_beta = alpha + self.SCOUT_WINDOW
+                    score = -self._negamax(state, depth - 1, -scout_beta, -alpha)
+                    if alpha < score < beta and scout_beta < beta:
+                        score = -self._negamax(state, depth - 1, -beta, -alpha)
+                state.unmake(undo)
+                if score > best_value:
+                    best_value = score
+                    best_move = move
+                if score > alpha:
+                    alpha = score
+                    pv[ply] = [move] + pv[ply + 1]
+                if alpha >= beta:
+                    self.move_orderer.record_cutoff(state, move, ply, depth, index)
+                    break  # Poda alfa-beta
+        
+        if tt is not None:
+            if best_value <= alpha_orig:
+                flag = UPPER
+            elif best_value >= beta:
+                flag = LOWER
+            else:
+                flag = EXACT
+            stored_depth = depth
+            if not self._horizon_reached and not self._tt_exact_depth:
+                stored_depth = self.RESOLVED_DEPTH
+            self._horizon_reached = self._horizon_reached or outer_horizon
+            tt.store(state.hash, stored_depth, flag, best_value - score_shift, best_move, popcount(state.blocked))
+        return best_value
+    
+    def _value_bounds(self, state: BitboardState, depth: int, is_maximizing: bool) -> Tuple[float, float]:
+        """Cotas de `_evaluate_position` en cualquier hoja a `depth` plies o menos.
+
+        - Puntuación: en sus `k` jugadas cada lado solo puede recoger casillas
+          a como mucho `k` saltos de sus caballos, y como mucho `k` de ellas;
+          se suman las `k` mejores (o peores) de esas casillas.
+        - Movilidad: entre 0 y 8 saltos por caballo.
+        - Proximidad: tras `k` saltos la distancia a cada casilla cambia como
+          mucho en `k` (ver `_proximity_bounds`).
+        """
+        w_score, _, w_proximity = self.weights
+        score_diff = state.scores[self.side] - state.scores[self.opponent_side]
+        mover_plies = (depth + 1) // 2
         if is_maximizing:
-            max_eval = -math.inf
-            moves = game.generate_moves_for_player(self.player_id)
-            
-            if not moves:  # No hay movimientos, cambiar turno y aplicar penalización
-                game_copy = self._copy_game(game)
-                game_copy._switch_turn()
-                return self._minimax(game_copy, depth - 1, False, alpha, beta)
-            
-            for move in moves:
-                game_copy = self._copy_game(game)
-                try:
-                    game_copy.apply_move(move[0], move[1])
-                    eval_score = self._minimax(game_copy, depth - 1, False, alpha, beta)
-                    max_eval = max(max_eval, eval_score)
-                    alpha = max(alpha, eval_score)
-                    if beta <= alpha:
-                        break  # Poda alfa-beta
-                except ValueError:
-                    continue
-            return max_eval
+            ai_plies, opponent_plies = mover_plies, depth - mover_plies
         else:
-            min_eval = math.inf
-            moves = game.generate_moves_for_player(self.opponent_id)
-            
-            if not moves:  # No hay movimientos, cambiar turno y aplicar penalización
-                game_copy = self._copy_game(game)
-                game_copy._switch_turn()
-                return self._minimax(game_copy, depth - 1, True, alpha, beta)
-            
-            for move in moves:
-                game_copy = self._copy_game(game)
-                try:
-                    game_copy.apply_move(move[0], move[1])
-                    eval_score = self._minimax(game_copy, depth - 1, True, alpha, beta)
-                    min_eval = min(min_eval, eval_score)
-                    beta = min(beta, eval_score)
-                    if beta <= alpha:
-                        break  # Poda alfa-beta
-                except ValueError:
+            ai_plies, opponent_plies = depth - mover_plies, mover_plies
+        ai_near = self._near(state, self.side, ai_plies)
+        opponent_near = self._near(state, self.opponent_side, opponent_plies)
+        ai_best, ai_worst = self._collectible(state, ai_near, ai_plies)
+        opponent_best, opponent_worst = self._collectible(state, opponent_near, opponent_plies)
+        score_low = ai_worst - opponent_best
+        score_high = ai_best - opponent_worst
+        
+        proximity_low = proximity_high = 0.0
+        if self._ai_horse is not None and self._opponent_horse is not None:
+            # casillas positivas que alguien podría recoger antes de la hoja
+            removable = (ai_near | opponent_near) & state.positive
+            ai_low, ai_high = self._proximity_bounds(state, state.horses[self._ai_horse], ai_plies, removable)
+            opponent_low, opponent_high = self._proximity_bounds(
+                state, state.horses[self._opponent_horse], opponent_plies, removable)
+            proximity_low = ai_low - opponent_high
+            proximity_high = ai_high - opponent_low
+        
+        lower, upper = self._mobility_bounds
+        for weight, low, high in ((w_score, score_low, score_high),
+                                  (w_proximity, proximity_low, proximity_high)):
+            if weight >= 0:
+                lower += weight * low
+                upper += weight * high
+            else:
+                lower += weight * high
+                upper += weight * low
+        shift = w_score * score_diff
+        return lower + shift, upper + shift
+    
+    def _near(self, state: BitboardState, side: int, plies: int) -> int:
+        """Casillas a las que `side` puede llegar en `plies` saltos (tablero vacío)."""
+        near = 0
+        if plies:
+            within = state.tables.within
+            for hidx, sq in enumerate(state.horses):
+                if state.owners[hidx] == side:
+                    near |= within(sq, plies)
+        return near
+    
+    def _collectible(self, state: BitboardState, near: int, plies: int) -> Tuple[int, int]:
+        """(máximo, mínimo) de puntos que se pueden sumar en `plies` jugadas
+        recogiendo casillas de `near`."""
+        key = (near & state.positive, near & state.negative, plies)
+        bounds = self._gain_cache.get(key)
+        if bounds is None:
+            values = state.values
+            gains = sorted(values[sq] for sq in iter_bits(key[0]))
+            losses = sorted(values[sq] for sq in iter_bits(key[1]))
+            bounds = (sum(gains[-plies:]), sum(losses[:plies])) if plies else (0, 0)
+            self._gain_cache[key] = bounds
+        return bounds
+    
+    def _proximity_bounds(self, state: BitboardState, sq: int, plies: int, removable: int) -> Tuple[float, float]:
+        """Cotas de la proximidad de un caballo en `sq` tras `plies` saltos suyos.
+
+        Con distancia `d` ahora, en la hoja está a entre `d - plies` y
+        `d + plies` saltos de cada casilla. Las casillas de `removable` pueden
+        desaparecer, así que no cuentan para la cota inferior. Con
+        `blocked_distances` las casillas pueden quedar encerradas, de modo
+        que la cota inferior es 0.
+        """
+        positive = state.positive
+        key = (sq, plies, positive, removable)
+        bounds = self._proximity_cache.get(key)
+        if bounds is None:
+            row = state.tables.distance_row(sq)
+            values = state.values
+            low = high = 0.0
+            for c in iter_bits(positive):
+                d = row[c]
+                if d < 0:
                     continue
-            return min_eval
+                high += values[c] / max(1, d - plies)
+                if not (removable >> c) & 1 and not self.blocked_distances:
+                    low += values[c] / (d + plies)
+            bounds = (low, high)
+            self._proximity_cache[key] = bounds
+        return bounds
     
-    def _evaluate_position(self, game: Game) -> float:
-        """Función heurística para evaluar una posición."""
+    def _track_evaluation(self, state: BitboardState) -> None:
+        """Prepara `state` para que la proximidad se mantenga incrementalmente.
+
+        Con esto cada hoja cuesta O(1): la diferencia de puntuación y las sumas
+        de proximidad se actualizan en make/unmake y la movilidad es un AND
+        con popcount por caballo.
+        """
+        state.track_proximity(self.blocked_distances)
+        # Cotas de `_value_bounds` que no cambian durante la búsqueda
+        self._gain_cache = {}
+        self._proximity_cache = {}
+        max_jumps = len(state.tables.deltas)
+        w_mobility = self.weights[1]
+        mobility = (-w_mobility * max_jumps * state.owners.count(self.opponent_side),
+                    w_mobility * max_jumps * state.owners.count(self.side))
+        self._mobility_bounds = (min(mobility), max(mobility))
+        # Igual que la versión sobre `Game`: cuenta el último caballo de cada lado
+        self._ai_horse = None
+        self._opponent_horse = None
+        for hidx, owner in enumerate(state.owners):
+            if owner == self.side:
+                self._ai_horse = hidx
+            else:
+                self._opponent_horse = hidx
+    
+    def _evaluate_position(self, state: BitboardState, ai_moves: Optional[int] = None,
+                           opponent_moves: Optional[int] = None) -> float:
+        """Función heurística para evaluar una posición.
+
+        `ai_moves`/`opponent_moves` permiten reutilizar la movilidad ya calculada.
+        """
         # Diferencia básica de puntuación
-        score_diff = game.scores.get(self.player_id, 0) - game.scores.get(self.opponent_id, 0)
+        score_diff = state.scores[self.side] - state.scores[self.opponent_side]
         
         # Factor de movilidad
-        ai_moves = len(game.generate_moves_for_player(self.player_id))
-        opponent_moves = len(game.generate_moves_for_player(self.opponent_id))
+        if ai_moves is None:
+            ai_moves = state.mobility(self.side)
+        if opponent_moves is None:
+            opponent_moves = state.mobility(self.opponent_side)
         mobility_diff = ai_moves - opponent_moves
         
         # Proximidad a casillas con puntos positivos
-        proximity_value = self._evaluate_proximity(game)
+        proximity_value = self._evaluate_proximity(state)
         
         # Combinar factores con pesos
-        heuristic = score_diff + 0.5 * mobility_diff + 0.3 * proximity_value
+        w_score, w_mobility, w_proximity = self.weights
+        heuristic = w_score * score_diff + w_mobility * mobility_diff + w_proximity * proximity_value
         
         return heuristic
     
-    def _evaluate_proximity(self, game: Game) -> float:
-        """Evalúa la proximidad a casillas con puntos valiosos."""
-        ai_horse = None
-        opponent_horse = None
+    def _evaluate_proximity(self, state: BitboardState) -> float:
+        """Evalúa la proximidad a casillas con puntos valiosos.
+
+        Usa las sumas incrementales de `state.proximity` si están activas y si
+        no las recalcula desde cero con la distancia exacta de caballo.
+        """
+        if state.proximity:
+            if self._ai_horse is None or self._opponent_horse is None:
+                return 0
+            return state.proximity[self._ai_horse] - state.proximity[self._opponent_horse]
+        
+        ai_square = None
+        opponent_square = None
         
-        for horse in game.horses.values():
-            if horse.owner == self.player_id:
-                ai_horse = horse
+        for hidx, sq in enumerate(state.horses):
+            if state.owners[hidx] == self.side:
+                ai_square = sq
             else:
-                opponent_horse = horse
+                opponent_square = sq
         
-        if not ai_horse or not opponent_horse:
+        if ai_square is None or opponent_square is None:
             return 0
         
+        if self.blocked_distances:
+            ai_row = state.tables.blocked_distance_row(ai_square, state.blocked)
+            opponent_row = state.tables.blocked_distance_row(opponent_square, state.blocked)
+        else:
+            ai_row = state.tables.distance_row(ai_square)
+            opponent_row = state.tables.distance_row(opponent_square)
+        positive = state.positive
+        values = state.values
         ai_proximity = 0
         opponent_proximity = 0
         
         # Evaluar distancia a casillas con puntos positivos
-        for pos, points in game.board.points.items():
-            if points > 0:  # Solo considerar puntos positivos
-                ai_dist = self._knight_distance(ai_horse.pos, pos)
-                opponent_dist = self._knight_distance(opponent_horse.pos, pos)
+        for sq in state.point_order:
+            if (positive >> sq) & 1:  # Solo considerar puntos positivos
+                points = values[sq]
+                ai_dist = ai_row[sq]
+                opponent_dist = opponent_row[sq]
                 
                 if ai_dist > 0:
                     ai_proximity += points / ai_dist
@@ -432,46 +1363,60 @@ class AIPlayer:
                     opponent_proximity += points / opponent_dist
         
         return ai_proximity - opponent_proximity
-    
-    def _knight_distance(self, pos1: Position, pos2: Position) -> int:
-        """Calcula la distancia mínima en movimientos de caballo entre dos posiciones."""
-        if pos1 == pos2:
-            return 0
-        
-        x1, y1 = pos1
-        x2, y2 = pos2
-        dx, dy = abs(x2 - x1), abs(y2 - y1)
-        
-        # Aproximación heurística para distancia de caballo
-        if dx == 1 and dy == 1:
-            return 2
-        if dx == 2 and dy == 2:
-            return 4
-        
-        # Para casos más complejos, usar una aproximación
-        return max(2, (dx + dy + 1) // 2)
-    
-    def _copy_game(self, game: Game) -> Game:
-        """Crea una copia profunda del juego para simulación."""
-        new_game = Game()
-        
-        # Copiar tablero
-        new_game.board = Board(game.board.width, game.board.height, game.board.points.copy())
-        new_game.board.blocked = game.board.blocked.copy()
-        
-        # Copiar caballos
-        new_game.horses = {}
-        for hid, horse in game.horses.items():
-            new_game.horses[hid] = Horse(horse.id, horse.owner, horse.pos)
-        
-        # Copiar estado del juego
-        new_game.turn = game.turn
-        new_game.scores = game.scores.copy()
-        
-        return new_game
+
+
+# Procesos auxiliares del modo paralelo de AIPlayer
+_worker_shared_alpha = None
+_worker_player: Optional[AIPlayer] = None
+_worker_search_id = None
+
+
+def _init_root_worker(shared_alpha) -> None:
+    global _worker_shared_alpha
+    _worker_shared_alpha = shared_alpha
+
+
+def _root_move_task(search_id, config: Dict[str, object], state: BitboardState, move: BitMove, depth: int,
+                    deadline: Optional[float], node_budget: Optional[int]) -> Optional[Tuple[float, int, bool]]:
+    """Busca un movimiento de la raíz en un proceso auxiliar.
+
+    Cada proceso conserva su `AIPlayer` (tabla de transposiciones, killers e
+    historia) mientras dure la misma llamada a `get_best_move`. La tabla solo
+    acepta entradas de la misma profundidad, de modo que el valor devuelto no
+    depende de qué otras tareas haya resuelto antes este proceso.
+    """
+    global _worker_player, _worker_search_id
+    if _worker_player is None or _worker_search_id != search_id:
+        _worker_player = AIPlayer(config["player_id"], use_tt=config["use_tt"],
+                                  tt_entries=config["tt_entries"],
+                                  move_orderer=config["orderer"](),
+                                  blocked_distances=config["blocked_distances"],
+                                  weights=config["weights"])
+        _worker_player._tt_exact_depth = True
+        _worker_search_id = search_id
+    return _worker_player._search_root_move(state, move, depth, deadline, node_budget, _worker_shared_alpha)
 
 
 # Helper functions kept for convenience
+_NEIGHBORS: Dict[Tuple[int, int], Dict[Position, Tuple[Position, ...]]] = {}
+
+
+def knight_neighbors(width: int, height: int) -> Dict[Position, Tuple[Position, ...]]:
+    """In-bounds knight destinations of every cell, in `KNIGHT_DELTAS` order.
+
+    Built once per board size from the bitboard `knight_tables` and cached,
+    so every game on a board of that size reuses it.
+    """
+    key = (width, height)
+    neighbors = _NEIGHBORS.get(key)
+    if neighbors is None:
+        tables = knight_tables(width, height, KNIGHT_DELTAS)
+        coords = tables.coords
+        neighbors = {coords[sq]: tuple(coords[to] for to in targets) for sq, targets in enumerate(tables.targets)}
+        _NEIGHBORS[key] = neighbors
+    return neighbors
+
+
 def create_random_point_cells(width: int, height: int, values: List[int], seed: Optional[int] = None) -> Dict[Position, int]:
     cells: List[Position] = [(x, y) for y in range(height) for x in range(width)]
     if len(cells) < len(values):
@@ -485,3 +1430,30 @@ def create_random_game(width: int = 8, height: int = 8, player_ids: Optional[Lis
     g = Game()
     g.initialize(width=width, height=height, player_ids=player_ids, seed=seed)
     return g
+
+
+def replay(log: GameRecord, plies: Optional[int] = None) -> Game:
+    """Rebuild the position after the first `plies` moves of `log` (all by default).
+
+    Moves are applied with `make_move`/`make_pass`, skipping the validation
+    of `apply_move`, so `log` must come from a real game. The returned game
+    has its own copy of the log and can be undone or played on.
+    """
+    game = Game()
+    board = Board(log.width, log.height, log.points)
+    for hid, owner, pos in log.horses:
+        game.horses[hid] = Horse(hid, owner, pos)
+        board.blocked.add(pos)
+    game.board = board
+    game.turn = log.turn
+    game.scores = {pid: 0 for pid in log.players}
+    game.log = log.copy(0)
+    hids = [hid for hid, _owner, _pos in log.horses]
+    for horse, to, points in log.entries(plies):
+        if horse is None:
+            game.scores[game.turn] += points
+            game._record(game.make_pass(), points)
+        else:
+            game._record(game.make_move(hids[horse], to), points)
+    game._touch()
+    return game
@@ -1,28 +1,332 @@
 import tkinter as tk
 from tkinter import messagebox, ttk
+import os
 import time
-from typing import Optional
+from typing import Dict, List, Optional, Tuple
 import threading
 
-from game import create_random_game, Game, Board, AIPlayer
+from game import create_random_game, replay, Game, Board, AIPlayer
+from record import GameRecord
+
+
+# Cada dificultad fija un objetivo de latencia (segundos por jugada) y un tope
+# de profundidad; la IA profundiza iterativamente hasta agotar el tiempo.
+DIFFICULTY_SETTINGS = {
+    "principiante": {"time_limit": 0.25, "depth": 2},
+    "amateur": {"time_limit": 1.0, "depth": 6},
+    "experto": {"time_limit": 3.0, "depth": None},
+}
+
+
+def create_ai_player(difficulty: str) -> AIPlayer:
+    """Crea la IA (siempre P1, blanco) con la configuración de la dificultad."""
+    settings = DIFFICULTY_SETTINGS.get(difficulty, DIFFICULTY_SETTINGS["amateur"])
+    return AIPlayer("P1", depth=settings["depth"], time_limit=settings["time_limit"])
+
+
+def format_progress(info) -> str:
+    """Texto de la etiqueta mientras la IA piensa (ver `AIPlayer.get_best_move`)."""
+    if info["proven"] is not None:
+        results = {"win": "gana", "draw": "empata", "loss": "pierde"}
+        return f"IA: final resuelto, {results[info['proven']]} por {info['value']:+.0f}"
+    text = f"IA pensando...  Profundidad {info['depth']}  |  {info['nodes']} nodos  |  {info['elapsed']:.1f} s"
+    if info["move"] is not None:
+        text += f"  |  Mejor: {info['move'][1]} ({info['value']:+.2f})"
+    return text
+
+
+class Ponderer:
+    """Búsqueda de la IA durante el turno del jugador humano.
+
+    Mientras el humano piensa, un hilo recorre sus respuestas posibles (la
+    prevista por la variante principal de la IA primero) y para cada una
+    busca la jugada de la IA con el mismo presupuesto que una búsqueda
+    normal. Cuando llega la jugada real, `finish` devuelve la respuesta ya
+    calculada, deja terminar la búsqueda en curso si era justo esa posición
+    o, si no, la cancela y devuelve None para que se busque como siempre.
+    """
+
+    def __init__(self, ai_player: AIPlayer):
+        self.ai_player = ai_player
+        self.active = False
+        # respuesta del humano -> (jugada de la IA, variante principal)
+        self.results: Dict[Tuple[str, Tuple[int, int]], Tuple[Optional[Tuple[str, Tuple[int, int]]], list]] = {}
+        self.hits = 0
+        self.misses = 0
+        self._current: Optional[Tuple[str, Tuple[int, int]]] = None
+        self._wanted: Optional[Tuple[str, Tuple[int, int]]] = None
+        self._cancel = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        # `_thread` se lee desde el hilo de la IA (`finish`) y el de Tk (`stop`)
+        self._lock = threading.Lock()
+
+    def start(self, game: Game) -> None:
+        """Empieza a pensar sobre las respuestas a `game` (turno del humano)."""
+        self.stop()
+        # una sola copia (barata, ver `Game.copy`) que el hilo recorre con
+        # `apply_move`/`undo_move`; se hace aquí porque la partida real solo
+        # se puede leer desde el hilo de Tk
+        game = game.copy()
+        replies = game.generate_moves_for_player(game.turn)
+        predicted = self.ai_player.principal_variation[1:2]
+        if predicted and predicted[0] in replies:
+            replies.remove(predicted[0])
+            replies.insert(0, predicted[0])
+        self.active = True
+        self.results = {}
+        self._wanted = None
+        self._cancel = threading.Event()
+        thread = threading.Thread(target=self._run, args=(game, replies, self._cancel))
+        thread.daemon = True
+        with self._lock:
+            self._thread = thread
+        thread.start()
+
+    def _run(self, game: Game, replies: List[Tuple[str, Tuple[int, int]]], cancel: threading.Event) -> None:
+        for reply in replies:
+            if cancel.is_set() or self._wanted is not None:
+                break
+            game.apply_move(reply[0], reply[1])
+            if game.is_game_over()[0] or not game.generate_moves_for_player(self.ai_player.player_id):
+                game.undo_move()
+                continue
+            self._current = reply
+            move, line = self.ai_player.get_best_line(game, cancel=cancel)
+            game.undo_move()
+            # se guarda antes de mirar `cancel` y de soltar `_current`: si
+            # `finish` llega ahora, encuentra la respuesta en `results`
+            if move is not None:
+                self.results[reply] = (move, line)
+            self._current = None
+            if cancel.is_set():
+                break
+
+    def finish(self, reply: Optional[Tuple[str, Tuple[int, int]]]) -> Optional[Tuple[str, Tuple[int, int]]]:
+        """Termina de pensar tras la jugada real `reply` del humano.
+
+        Devuelve la jugada de la IA si ya estaba calculada (o se estaba
+        calculando) para esa respuesta; None en otro caso.
+        """
+        if not self.active:
+            return None
+        if reply is not None and reply in self.results:
+            self.stop()
+        elif reply is not None and reply == self._current:
+            # la búsqueda en curso es la buena: se deja acabar y no se empieza otra
+            self._wanted = reply
+            if reply in self.results:
+                # acabó justo antes de ver `_wanted`: no esperar a la siguiente
+                self._cancel.set()
+            self._join()
+            self.active = False
+        else:
+            self.stop()
+        if reply is None or reply not in self.results:
+            self.misses += 1
+            return None
+        self.hits += 1
+        move, line = self.results[reply]
+        # la siguiente predicción sale de esta búsqueda, no de la última hecha
+        self.ai_player.principal_variation = line
+        return move
+
+    def stop(self) -> None:
+        """Cancela la búsqueda en curso y espera a que el hilo termine."""
+        self._cancel.set()
+        self._join()
+        self._current = None
+        self.active = False
+
+    def _join(self) -> None:
+        # se toma el hilo bajo el candado y se espera fuera de él
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            thread.join()
+
+
+class ButtonBoard:
+    """Tablero con un `tk.Button` por casilla (el aspecto clásico).
+
+    Sirve hasta unos 20x20; por encima crear y mantener tantos widgets hace
+    el arranque lento y la memoria se dispara (ver `CanvasBoard`).
+    """
+
+    def __init__(self, parent, width: int, height: int, on_click):
+        self.buttons = {}
+        # Crear botones para el tablero con estilo de ajedrez
+        for y in range(height):
+            for x in range(width):
+                btn = tk.Button(parent, width=8, height=4,
+                                command=lambda p=(x, y): on_click(p),
+                                relief=tk.RAISED, bd=2,
+                                font=('Arial', 11, 'bold'),
+                                cursor='hand2')
+                btn.grid(row=y, column=x, padx=0, pady=0)
+                self.buttons[(x, y)] = btn
+
+    def cells(self):
+        return self.buttons.keys()
+
+    def paint(self, pos, look: Tuple[str, str, str]) -> None:
+        text, bg, fg = look
+        self.buttons[pos].config(text=text, bg=bg, fg=fg)
+
+    def destroy(self) -> None:
+        for b in self.buttons.values():
+            b.destroy()
+        self.buttons.clear()
+
+
+class CanvasBoard:
+    """Tablero dibujado en un único `tk.Canvas`.
+
+    Cada casilla es un rectángulo y un texto con la etiqueta `cell` y su
+    posición en `items`; los clics se traducen a casilla dividiendo por el
+    lado de la celda, que se ajusta para que el tablero quepa en
+    `MAX_PIXELS`. Pintar una casilla solo reconfigura sus dos elementos, así
+    que tableros de 50x50 o más arrancan y se redibujan al momento.
+    """
+
+    MAX_PIXELS = 720
+    MAX_CELL = 64
+    MIN_CELL = 8
+
+    def __init__(self, parent, width: int, height: int, on_click):
+        self.cell = max(self.MIN_CELL, min(self.MAX_CELL, self.MAX_PIXELS // max(width, height)))
+        self.width = width
+        self.height = height
+        self.on_click = on_click
+        self.canvas = tk.Canvas(parent, width=width * self.cell, height=height * self.cell,
+                                bg='#4A2511', highlightthickness=0, cursor='hand2')
+        self.canvas.pack()
+        font = ('Arial', max(6, self.cell // 4), 'bold')
+        self.items = {}
+        for y in range(height):
+            for x in range(width):
+                x0, y0 = x * self.cell, y * self.cell
+                rect = self.canvas.create_rectangle(x0, y0, x0 + self.cell, y0 + self.cell,
+                                                    outline='#4A2511', tags=('cell',))
+                text = self.canvas.create_text(x0 + self.cell // 2, y0 + self.cell // 2,
+                                               font=font, tags=('cell',))
+                self.items[(x, y)] = (rect, text)
+        self.canvas.bind('<Button-1>', self._on_click)
+
+    def _on_click(self, event) -> None:
+        x = int(self.canvas.canvasx(event.x)) // self.cell
+        y = int(self.canvas.canvasy(event.y)) // self.cell
+        if 0 <= x < self.width and 0 <= y < self.height:
+            self.on_click((x, y))
+
+    def cells(self):
+        return self.items.keys()
+
+    def paint(self, pos, look: Tuple[str, str, str]) -> None:
+        text, bg, fg = look
+        rect, label = self.items[pos]
+        self.canvas.itemconfigure(rect, fill=bg)
+        self.canvas.itemconfigure(label, text=text, fill=fg)
+
+    def destroy(self) -> None:
+        self.canvas.destroy()
+        self.items.clear()
+
+
+def cell_look(game: Game, pos, occ, moves_set, selected_horse_id: Optional[str] = None) -> Tuple[str, str, str]:
+    """(texto, fondo, color de texto) con el que se pinta la casilla `pos`.
+
+    `occ` es `game.occupied_positions()`, `moves_set` los destinos a resaltar
+    y `selected_horse_id` el caballo que se dibuja en verde.
+    """
+    # Determinar color base de la casilla (patrón de ajedrez)
+    x, y = pos
+    is_light = (x + y) % 2 == 0
+    base_light = '#F0D9B5'  # Beige claro
+    base_dark = '#B58863'   # Marrón
+    
+    bg = base_light if is_light else base_dark
+    text = ''
+    fg = '#2C1810'  # Color de texto oscuro
+    
+    blocked = game.board.is_blocked(pos)
+    
+    # highlight move destinations first (even if they have points)
+    if pos in moves_set:
+        # if there are points, show them but keep highlight
+        text = str(game.board.points[pos]) if pos in game.board.points else ''
+        return text, '#FFD700', '#2C1810'  # Dorado para movimientos válidos
+    if pos in occ:
+        h = game.horses[occ[pos]]
+        # Mantener color base de ajedrez cuando hay caballo
+        text = "♞"
+        if h.owner == 'P1':  # IA (Blanco)
+            fg = '#FFFFFF'  # Blanco
+        else:  # Jugador humano (Negro)
+            fg = '#000000'  # Negro
+        
+        if selected_horse_id == occ[pos]:
+            bg = '#90EE90'  # Verde claro para selección
+            fg = '#2C1810'
+        elif blocked:
+            bg = '#3D3D3D'  # Negro para casillas bloqueadas
+        # Si no está seleccionado ni bloqueado, mantiene bg del patrón de ajedrez
+    elif pos in game.board.points:
+        val = game.board.points[pos]
+        text = str(val)
+        # Tonos verdes para positivos, rojos para negativos, sobre base de ajedrez
+        if val > 0:
+            bg = '#90EE90' if is_light else '#7FD67F'  # Verde
+        else:
+            bg = '#FFB6B6' if is_light else '#FF9999'  # Rojo
+        if blocked:
+            bg = '#3D3D3D'  # Negro para casillas bloqueadas
+    elif blocked:
+        bg = '#3D3D3D'  # Negro para casillas bloqueadas
+    return text, bg, fg
+
+
+RENDERERS = {"buttons": ButtonBoard, "canvas": CanvasBoard}
+# Con "auto", tableros mayores que esto se dibujan en un Canvas
+AUTO_CANVAS_SIZE = 20
+
+
+def choose_renderer(renderer: str, width: int, height: int) -> str:
+    if renderer == "auto":
+        return "canvas" if max(width, height) > AUTO_CANVAS_SIZE else "buttons"
+    return renderer
 
 
 class GameGUI:
-    def __init__(self, root: tk.Tk, game: Game, difficulty: str = "amateur"):
+    def __init__(self, root: tk.Tk, game: Game, difficulty: str = "amateur", ponder: bool = True,
+                 renderer: str = "auto", record_path: Optional[str] = None):
         self.root = root
         self.game = game
+        # Fichero donde se va escribiendo el registro de la partida (ver `GameRecord.attach`);
+        # las partidas siguientes van a `nombre-2.ext`, `nombre-3.ext`... (ver `_record_name`)
+        self.record_path = record_path
+        self._record_file = None
+        self._record_games = 0
+        self._open_record()
         self.board: Board = game.board
         self.selected_horse_id: Optional[str] = None
         self.difficulty = difficulty
         self.ai_thinking = False
+        # "buttons", "canvas" o "auto" (según el tamaño; ver `choose_renderer`)
+        self.renderer = renderer
         
         # Configurar IA según dificultad
-        depth_map = {"principiante": 2, "amateur": 4, "experto": 6}
-        self.ai_player = AIPlayer("P1", depth_map.get(difficulty, 4))  # IA siempre es P1 (blanco)
+        self.ai_player = create_ai_player(difficulty)  # IA siempre es P1 (blanco)
+        # La IA sigue pensando durante el turno del humano (ver `Ponderer`)
+        self.ponder = ponder
+        self.ponderer = Ponderer(self.ai_player)
+        self.last_human_move: Optional[Tuple[str, Tuple[int, int]]] = None
+        # Cancelación de la búsqueda en curso de la IA (None = no está pensando)
+        self._ai_cancel: Optional[threading.Event] = None
 
         # Configurar ventana principal con estilo de ajedrez
         root.title('♞ Smart Horses - Jugador vs IA ♞')
         root.configure(bg='#2C1810')  # Fondo marrón oscuro tipo madera
+        root.protocol("WM_DELETE_WINDOW", self.on_close)
         
         # Panel de control superior con estilo elegante
         ctrl = tk.Frame(root, bg='#8B4513', relief=tk.RAISED, bd=3)
@@ -47,91 +351,49 @@ class GameGUI:
 
     # no image for horses; show horse id text on the buttons
 
-        self.cell_buttons = {}
+        self.board_view = None
+        # último aspecto dibujado de cada casilla (ver `refresh`)
+        self._rendered: Dict[Tuple[int, int], Tuple[str, str, str]] = {}
+        self.last_redraw = (0, 0.0)
         self._build_board_ui()
         self.refresh()
 
     def _build_board_ui(self):
-        # Crear botones para el tablero con estilo de ajedrez
-        for y in range(self.board.height):
-            for x in range(self.board.width):
-                # Determinar color de casilla base (patrón de ajedrez)
-                is_light = (x + y) % 2 == 0
-                
-                btn = tk.Button(self.board_frame, width=8, height=4,
-                                command=lambda p=(x, y): self.on_cell_click(p),
-                                relief=tk.RAISED, bd=2,
-                                font=('Arial', 11, 'bold'),
-                                cursor='hand2')
-                btn.grid(row=y, column=x, padx=0, pady=0)
-                self.cell_buttons[(x, y)] = btn
+        name = choose_renderer(self.renderer, self.board.width, self.board.height)
+        self.board_view = RENDERERS[name](self.board_frame, self.board.width, self.board.height,
+                                          self.on_cell_click)
+
+    def _cell_look(self, pos, occ, moves_set) -> Tuple[str, str, str]:
+        return cell_look(self.game, pos, occ, moves_set, self.selected_horse_id)
 
     def refresh(self):
+        """Redibuja el tablero y la barra de información y sigue con el turno.
+
+        Solo se reconfiguran los botones cuyo aspecto cambió respecto al
+        último dibujo (`_rendered`): normalmente los destinos resaltados, las
+        casillas de los caballos y la recién bloqueada. `last_redraw` guarda
+        (casillas reconfiguradas, segundos) del último refresco.
+        """
+        start = time.perf_counter()
         occ = self.game.occupied_positions()
+        over = self.is_game_over()[0]
+        # una sola generación sirve para el resaltado y para detectar el pase
+        current_moves = [] if over else self.game.generate_moves_for_player(self.game.turn)
         # compute legal destinations for selected horse
         moves_set = set()
         if self.selected_horse_id is not None:
-            moves = self.game.generate_moves_for_player(self.game.turn)
-            moves_set = {dst for hid, dst in moves if hid == self.selected_horse_id}
-
-        for pos, btn in self.cell_buttons.items():
-            # Determinar color base de la casilla (patrón de ajedrez)
-            x, y = pos
-            is_light = (x + y) % 2 == 0
-            base_light = '#F0D9B5'  # Beige claro
-            base_dark = '#B58863'   # Marrón
-            
-            bg = base_light if is_light else base_dark
-            text = ''
-            fg = '#2C1810'  # Color de texto oscuro
-            
-            blocked = self.board.is_blocked(pos)
-            
-            # highlight move destinations first (even if they have points)
-            if pos in moves_set:
-                bg = '#FFD700'  # Dorado para movimientos válidos
-                # if there are points, show them but keep highlight
-                if pos in self.board.points:
-                    text = str(self.board.points[pos])
-                else:
-                    text = ''
-                btn.config(text=text, bg=bg, fg='#2C1810', font=('Arial', 11, 'bold'))
-                continue
-            if pos in occ:
-                hid = occ[pos]
-                h = self.game.horses[hid]
-                # Mantener color base de ajedrez cuando hay caballo
-                if h.owner == 'P1':  # IA (Blanco)
-                    text = f"♞"  # Caballo blanco
-                    fg = '#FFFFFF'  # Blanco
-                else:  # Jugador humano (Negro)
-                    text = f"♞"  # Caballo negro
-                    fg = '#000000'  # Negro
-                
-                if self.selected_horse_id == hid:
-                    bg = '#90EE90'  # Verde claro para selección
-                    fg = '#2C1810'
-                elif blocked:
-                    bg = '#3D3D3D'  # Negro para casillas bloqueadas
-                # Si no está seleccionado ni bloqueado, mantiene bg del patrón de ajedrez
-            elif pos in self.board.points:
-                val = self.board.points[pos]
-                text = str(val)
-                # Tonos verdes para positivos, rojos para negativos, sobre base de ajedrez
-                if val > 0:
-                    bg = '#90EE90' if is_light else '#7FD67F'  # Verde
-                else:
-                    bg = '#FFB6B6' if is_light else '#FF9999'  # Rojo
-                if blocked:
-                    bg = '#3D3D3D'  # Negro para casillas bloqueadas
-            elif pos in moves_set:
-                bg = '#FFD700'  # Dorado
-            else:
-                bg = base_light if is_light else base_dark
-                if blocked:
-                    bg = '#3D3D3D'  # Negro para casillas bloqueadas
+            moves_set = {dst for hid, dst in current_moves if hid == self.selected_horse_id}
 
-            btn.config(text=text, bg=bg, fg=fg, font=('Arial', 11, 'bold'))
+        rendered = self._rendered
+        updated = 0
+        view = self.board_view
+        for pos in view.cells():
+            look = self._cell_look(pos, occ, moves_set)
+            if rendered.get(pos) != look:
+                rendered[pos] = look
+                view.paint(pos, look)
+                updated += 1
+        self.last_redraw = (updated, time.perf_counter() - start)
 
         # update info label
         turn_text = "IA (Blanco)" if self.game.turn == "P1" else "Jugador (Negro)"
@@ -140,15 +402,13 @@ class GameGUI:
         self.info_label.config(text=f"Turno: {turn_text}  |  {difficulty_text}  |  {scores_text}")
         
         # Verificar si el juego terminó antes de procesar turnos
-        if self.is_game_over()[0]:
+        if over:
             return
             
         # Verificar si el jugador actual tiene movimientos disponibles
-        current_moves = self.game.generate_moves_for_player(self.game.turn)
         if not current_moves:
             # El jugador actual no tiene movimientos - aplicar penalización y cambiar turno
-            self.game.scores[self.game.turn] = self.game.scores.get(self.game.turn, 0) - 4
-            self.game._switch_turn()
+            self.game.apply_pass()
             # Actualizar la visualización después del cambio de turno
             self.root.after(100, self.refresh)
             return
@@ -156,6 +416,8 @@ class GameGUI:
         # Si es turno de la IA y no está pensando, hacer movimiento
         if self.game.turn == "P1" and not self.ai_thinking:
             self.make_ai_move()
+        elif self.game.turn == "P2" and self.ponder and not self.ai_thinking and not self.ponderer.active:
+            self.ponderer.start(self.game)
 
     def on_cell_click(self, pos):
         # Solo permitir interacción si es turno del jugador humano (P2) y la IA no está pensando
@@ -195,34 +457,97 @@ class GameGUI:
             return
         # deselect
         self.selected_horse_id = None
+        self.last_human_move = (hid, pos)
         self.refresh()
         self.check_game_over()
 
     def make_ai_move(self):
-        """Hace que la IA realice su movimiento en un hilo separado."""
+        """Hace que la IA realice su movimiento en un hilo separado.
+
+        La búsqueda trabaja sobre una copia del juego y se puede cancelar
+        (`cancel_ai`); la jugada se aplica en el hilo de Tk y solo si nadie
+        la canceló entretanto, así que una partida nueva nunca recibe la
+        jugada de la anterior.
+        """
+        cancel = threading.Event()
+        self._ai_cancel = cancel
+        ai_player = self.ai_player
+        ponderer = self.ponderer
+        last_human_move = self.last_human_move
+        self.last_human_move = None
+        game = self.game.copy()
+        
+        def on_progress(info):
+            if not cancel.is_set():
+                text = format_progress(info)
+                self.root.after(0, lambda: self._show_progress(cancel, text))
+        
         def ai_move_thread():
-            self.ai_thinking = True
-            self.root.after(0, lambda: self.info_label.config(text="IA está pensando..."))
-            
-            # Pequeña pausa para mostrar que la IA está pensando
-            time.sleep(0.5)
-            
-            best_move = self.ai_player.get_best_move(self.game)
-            
-            if best_move:
-                try:
-                    self.game.apply_move(best_move[0], best_move[1])
-                except Exception:
-                    pass
-            
-            self.ai_thinking = False
-            self.root.after(0, self.refresh)
-            self.root.after(0, self.check_game_over)
+            # Si ya lo pensó durante el turno del humano, responde al momento
+            best_move = ponderer.finish(last_human_move)
+            if best_move is None:
+                # Pequeña pausa para mostrar que la IA está pensando
+                if cancel.wait(0.5):
+                    return
+                best_move = ai_player.get_best_move(game, cancel=cancel, progress=on_progress)
+            if not cancel.is_set():
+                self.root.after(0, lambda: self._finish_ai_move(cancel, best_move))
         
+        self.ai_thinking = True
+        self.info_label.config(text="IA está pensando...")
         thread = threading.Thread(target=ai_move_thread)
         thread.daemon = True
         thread.start()
     
+    def _show_progress(self, cancel: threading.Event, text: str):
+        if cancel is self._ai_cancel and not cancel.is_set():
+            self.info_label.config(text=text)
+    
+    def _finish_ai_move(self, cancel: threading.Event, best_move):
+        """Aplica la jugada de la IA (en el hilo de Tk) si sigue siendo válida."""
+        if cancel is not self._ai_cancel or cancel.is_set():
+            return
+        self._ai_cancel = None
+        if best_move:
+            try:
+                self.game.apply_move(best_move[0], best_move[1])
+            except Exception:
+                pass
+        self.ai_thinking = False
+        self.refresh()
+        self.check_game_over()
+    
+    def cancel_ai(self):
+        """Cancela la búsqueda de la IA y el pondering en curso."""
+        if self._ai_cancel is not None:
+            self._ai_cancel.set()
+            self._ai_cancel = None
+        self.ponderer.stop()
+        self.ai_thinking = False
+    
+    def on_close(self):
+        self.cancel_ai()
+        self.ai_player.close()
+        self._close_record()
+        self.root.destroy()
+
+    def _record_name(self, number: int) -> str:
+        if number == 1:
+            return self.record_path
+        root, ext = os.path.splitext(self.record_path)
+        return f"{root}-{number}{ext}"
+
+    def _open_record(self):
+        if self.record_path is not None and self.game.log is not None:
+            self._record_games += 1
+            self._record_file = open(self._record_name(self._record_games), 'wb')
+            self.game.log.attach(self._record_file)
+
+    def _close_record(self):
+        if self._record_file is not None:
+            self._record_file.close()
+            self._record_file = None
+    
     def check_game_over(self):
         """Verifica si el juego ha terminado y muestra el resultado."""
         over, reason, winner = self.game.is_game_over()
@@ -241,7 +566,9 @@ class GameGUI:
             scores_p2 = final_scores.get('P2', 0)
             
             # Mostrar diálogo personalizado con estilo de ajedrez
-            show_game_over_dialog(self.root, winner_text, scores_p1, scores_p2, self.new_game)
+            log = self.game.log.copy() if self.game.log is not None else None
+            show_game_over_dialog(self.root, winner_text, scores_p1, scores_p2, self.new_game,
+                                  game_log=log, renderer=self.renderer)
     
     def is_game_over(self):
         """Wrapper para acceder al método is_game_over del juego."""
@@ -255,28 +582,117 @@ class GameGUI:
         if new_difficulty is None:
             return
         
-        # Actualizar dificultad y IA
+        # Parar la búsqueda de la partida anterior y crear una IA nueva: el
+        # hilo cancelado puede seguir un momento dentro de la IA anterior
+        # (que se queda con él) y esperarlo aquí bloquearía a Tk
+        self.cancel_ai()
+        self.ai_player.close()
+        self.ai_player = create_ai_player(new_difficulty)
         self.difficulty = new_difficulty
-        depth_map = {"principiante": 2, "amateur": 4, "experto": 6}
-        self.ai_player = AIPlayer("P1", depth_map.get(new_difficulty, 4))
+        self.ponderer = Ponderer(self.ai_player)
+        self.last_human_move = None
         
         # Reinicializar juego
         seed = int(time.time()) % 100000
         self.game.initialize(width=self.board.width, height=self.board.height, seed=seed)
         self.board = self.game.board
+        self._close_record()
+        self._open_record()
         
         # Reconstruir UI si cambió el tamaño
-        for b in self.cell_buttons.values():
-            b.destroy()
-        self.cell_buttons.clear()
+        self.board_view.destroy()
+        self._rendered.clear()
         self._build_board_ui()
         self.selected_horse_id = None
-        self.ai_thinking = False
         self.refresh()
 
 
-def show_game_over_dialog(parent, winner_text, score_p1, score_p2, new_game_callback):
-    """Muestra un diálogo personalizado de fin de juego con estilo de ajedrez."""
+class GameViewer:
+    """Ventana para repasar una partida jugada a jugada.
+
+    Cada posición se reconstruye con `replay(log, jugada)` a partir del
+    registro de la partida, así que saltar a cualquier jugada es inmediato.
+    Se navega con los botones o con las flechas, Inicio y Fin; el caballo
+    que acaba de mover se marca en verde.
+    """
+
+    def __init__(self, parent, log: GameRecord, renderer: str = "auto"):
+        self.log = log
+        self.ply = len(log)
+        self.window = tk.Toplevel(parent)
+        self.window.title('♞ Ver Partida')
+        self.window.configure(bg='#2C1810')
+
+        self.info_label = tk.Label(self.window, text='', bg='#D2B48C', fg='#2C1810',
+                                   font=('Georgia', 10, 'bold'), relief=tk.SUNKEN, bd=2, padx=10, pady=5)
+        self.info_label.pack(side=tk.TOP, fill=tk.X, padx=8, pady=8)
+
+        board_container = tk.Frame(self.window, bg='#8B4513', relief=tk.RAISED, bd=8)
+        board_container.pack(padx=10, pady=10)
+        board_frame = tk.Frame(board_container, bg='#4A2511', relief=tk.SUNKEN, bd=4)
+        board_frame.pack(padx=4, pady=4)
+        name = choose_renderer(renderer, log.width, log.height)
+        self.board_view = RENDERERS[name](board_frame, log.width, log.height, lambda pos: None)
+        self._rendered: Dict[Tuple[int, int], Tuple[str, str, str]] = {}
+
+        nav = tk.Frame(self.window, bg='#2C1810')
+        nav.pack(pady=8)
+        for text, command in (('⏮', self.first), ('◀', self.previous), ('▶', self.next), ('⏭', self.last)):
+            tk.Button(nav, text=text, width=4, font=('Georgia', 12, 'bold'),
+                      bg='#B58863', fg='#FFFFFF', activebackground='#8B4513',
+                      relief=tk.RAISED, bd=3, cursor='hand2',
+                      command=command).pack(side=tk.LEFT, padx=5)
+        self.window.bind('<Home>', lambda e: self.first())
+        self.window.bind('<Left>', lambda e: self.previous())
+        self.window.bind('<Right>', lambda e: self.next())
+        self.window.bind('<End>', lambda e: self.last())
+        self.show(self.ply)
+
+    def first(self):
+        self.show(0)
+
+    def previous(self):
+        self.show(self.ply - 1)
+
+    def next(self):
+        self.show(self.ply + 1)
+
+    def last(self):
+        self.show(len(self.log))
+
+    def show(self, ply: int):
+        """Dibuja la posición tras las primeras `ply` jugadas."""
+        ply = max(0, min(len(self.log), ply))
+        self.ply = ply
+        game = replay(self.log, ply)
+        moved = None
+        description = "Posición inicial"
+        if ply:
+            horse, to, points = self.log.entry(ply - 1)
+            mover = replay(self.log, ply - 1).turn
+            name = "IA (Blanco)" if mover == "P1" else "Jugador (Negro)"
+            if horse is None:
+                description = f"{name} pasa ({points:+d})"
+            else:
+                moved = self.log.horses[horse][0]
+                description = f"{name} a {to}" + (f" ({points:+d})" if points else "")
+        occ = game.occupied_positions()
+        for pos in self.board_view.cells():
+            look = cell_look(game, pos, occ, (), moved)
+            if self._rendered.get(pos) != look:
+                self._rendered[pos] = look
+                self.board_view.paint(pos, look)
+        self.info_label.config(text=f"Jugada {ply}/{len(self.log)}  |  {description}  |  "
+                                    f"Puntos - IA: {game.scores.get('P1', 0)} | "
+                                    f"Jugador: {game.scores.get('P2', 0)}")
+
+
+def show_game_over_dialog(parent, winner_text, score_p1, score_p2, new_game_callback,
+                          game_log: Optional[GameRecord] = None, renderer: str = "auto"):
+    """Muestra un diálogo personalizado de fin de juego con estilo de ajedrez.
+
+    Con `game_log`, "Ver Partida" abre un `GameViewer` sobre la partida.
+    """
     dialog = tk.Toplevel(parent)
     dialog.title("♔ Fin del Juego")
     dialog.geometry("420x300")
@@ -331,6 +747,8 @@ def show_game_over_dialog(parent, winner_text, score_p1, score_p2, new_game_call
     
     def on_view_game():
         dialog.destroy()
+        if game_log is not None:
+            GameViewer(parent, game_log, renderer)
     
     def on_new_game():
         dialog.destroy()
@@ -436,6 +854,14 @@ def main():
     parser.add_argument('--size', type=int, default=8, help='board size')
     parser.add_argument('--difficulty', type=str, choices=["principiante", "amateur", "experto"], 
                        help='AI difficulty level')
+    parser.add_argument('--renderer', type=str, choices=["auto", "buttons", "canvas"], default="auto",
+                       help='board widgets: one button per cell or a single canvas '
+                            f'(auto: canvas above {AUTO_CANVAS_SIZE}x{AUTO_CANVAS_SIZE})')
+    parser.add_argument('--no-ponder', action='store_true',
+                       help="don't let the AI think during the player's turn")
+    parser.add_argument('--record', type=str,
+                       help='binary file where the game record is written as the game is played '
+                            '(later games in the session go to NAME-2.EXT, NAME-3.EXT, ...)')
     args = parser.parse_args()
     
     # Seleccionar dificultad si no se proporcionó
@@ -454,7 +880,8 @@ def main():
     
     # Crear ventana principal
     root = tk.Tk()
-    app = GameGUI(root, g, difficulty)
+    app = GameGUI(root, g, difficulty, ponder=not args.no_ponder, renderer=args.renderer,
+                  record_path=args.record)
     root.mainloop()
 
 
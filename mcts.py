@@ -0,0 +1,374 @@
+"""Búsqueda de Monte Carlo en árbol (UCT) como alternativa a `AIPlayer`.
+
+`MCTSPlayer` tiene la misma interfaz que `AIPlayer` (`get_best_move`,
+`nodes`, `close`...) y se puede usar en su lugar en `tournament.py`
+(`engine=mcts`). En cada iteración baja por el árbol eligiendo con UCB1,
+añade un nodo y termina la partida con una simulación rápida; el
+resultado (victoria, empate o derrota) se propaga hacia la raíz. Al final
+se juega el movimiento de la raíz más visitado.
+
+Las simulaciones trabajan directamente con las máscaras de bits del
+`BitboardState` en variables locales (bloqueadas, casillas con puntos,
+casillas de los caballos), sin `make`/`unmake` ni listas de movimientos, y
+aplican las mismas reglas que `Game`: quien no puede moverse mientras el otro
+sí pierde `Game.PASS_PENALTY` puntos.
+"""
+import math
+import random
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+from bitboard import BitboardState, BitMove, iter_bits, popcount
+from game import Game, KNIGHT_DELTAS, Position
+from search import process_pool
+
+PLAYOUTS = ("random", "greedy")
+
+
+class _Node:
+    """Nodo del árbol: `wins` se cuenta desde el lado `mover`, el que jugó `move`.
+
+    `move` es None para un pase. `untried` son los movimientos aún sin nodo
+    (None si todavía no se han generado).
+    """
+
+    __slots__ = ("move", "parent", "mover", "children", "untried", "visits", "wins")
+
+    def __init__(self, move: Optional[BitMove], parent: Optional['_Node'], mover: int):
+        self.move = move
+        self.parent = parent
+        self.mover = mover
+        self.children: List['_Node'] = []
+        self.untried: Optional[List[Optional[BitMove]]] = None
+        self.visits = 0
+        self.wins = 0.0
+
+
+def _check_iterations(iterations: Optional[int]) -> None:
+    # con menos de una iteración la raíz se queda sin hijos que elegir
+    if iterations is not None and iterations < 1:
+        raise ValueError("iterations must be at least 1")
+
+
+class MCTSPlayer:
+    """IA por búsqueda de Monte Carlo en árbol con simulaciones aleatorias.
+
+    El presupuesto de cada jugada es `iterations` (simulaciones) o
+    `time_limit` (segundos), o lo primero que se agote si se dan los dos.
+    `playout` elige la política de las simulaciones: "random" (uniforme) o
+    "greedy", que con probabilidad `greedy` toma la casilla positiva de más
+    valor a su alcance o, si no hay, evita las negativas. `exploration` es la
+    constante de UCB1.
+
+    Con `workers > 1` se paraleliza por la raíz: cada proceso (y el propio)
+    hace crecer un árbol independiente con otra semilla y al final se suman
+    las visitas de los movimientos de la raíz. El presupuesto de iteraciones
+    se reparte entre los árboles; el de tiempo lo usa cada uno entero.
+    """
+
+    DEFAULT_ITERATIONS = 2000
+    EXPLORATION = 1.4
+    GREEDY = 0.75
+    # Cada cuántas iteraciones se consulta el reloj y la cancelación
+    CHECK_EVERY = 64
+    # Segundos mínimos entre avisos de progreso
+    PROGRESS_INTERVAL = 0.1
+
+    def __init__(self, player_id: str, iterations: Optional[int] = None,
+                 time_limit: Optional[float] = None, playout: str = "greedy",
+                 exploration: float = EXPLORATION, greedy: float = GREEDY,
+                 workers: int = 1, seed: Optional[int] = None):
+        if playout not in PLAYOUTS:
+            raise ValueError(f"Unknown playout policy {playout!r}")
+        _check_iterations(iterations)
+        self.player_id = player_id
+        self.opponent_id = "P2" if player_id == "P1" else "P1"
+        if iterations is None and time_limit is None:
+            iterations = self.DEFAULT_ITERATIONS
+        self.iterations = iterations
+        self.time_limit = time_limit
+        self.playout = playout
+        self.exploration = exploration
+        self.greedy = greedy if playout == "greedy" else 0.0
+        self.workers = max(1, workers)
+        self.pass_penalty = Game.PASS_PENALTY
+        self._random = random.Random(seed)
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+        self.nodes = 0
+        self.max_depth = 0
+        self.last_value: Optional[float] = None
+        self.last_elapsed = 0.0
+        self.principal_variation: List[Optional[Tuple[str, Position]]] = []
+        # visitas y victorias de cada movimiento de la raíz en la última búsqueda
+        self.root_stats: Dict[Optional[BitMove], Tuple[int, float]] = {}
+
+    def get_best_move(self, game: Game, time_limit: Optional[float] = None,
+                      iterations: Optional[int] = None, cancel: Optional[threading.Event] = None,
+                      progress: Optional[Callable[[Dict[str, object]], None]] = None
+                      ) -> Optional[Tuple[str, Position]]:
+        """Devuelve el movimiento de la raíz más visitado, o None si no hay.
+
+        Sin límites explícitos se usan los del constructor. `cancel` y
+        `progress` funcionan como en `AIPlayer.get_best_move`; `progress`
+        recibe `nodes` = iteraciones y `depth` = profundidad máxima del árbol.
+        En paralelo solo el árbol del propio proceso atiende a `cancel`.
+        """
+        _check_iterations(iterations)
+        if not game.generate_moves_for_player(self.player_id):
+            return None
+        if time_limit is None and iterations is None:
+            time_limit = self.time_limit
+            iterations = self.iterations
+        start = time.perf_counter()
+        state = BitboardState.from_game(game, KNIGHT_DELTAS)
+        state.set_turn(state.side_of(self.player_id))
+
+        futures = []
+        local_iterations = iterations
+        if self.workers > 1:
+            if iterations is not None:
+                local_iterations = -(-iterations // self.workers)
+            pool = self._get_pool()
+            config = self._worker_config()
+            futures = [pool.submit(_mcts_task, config, state, local_iterations, time_limit,
+                                   self._random.getrandbits(32))
+                       for _ in range(self.workers - 1)]
+        root = self._search(state, local_iterations, time_limit, cancel, progress, start)
+        stats = {child.move: (child.visits, child.wins) for child in root.children}
+        nodes = root.visits
+        for future in futures:
+            if cancel is not None and cancel.is_set():
+                future.cancel()
+                continue
+            worker_stats, worker_nodes = future.result()
+            nodes += worker_nodes
+            for move, (visits, wins) in worker_stats.items():
+                total_visits, total_wins = stats.get(move, (0, 0.0))
+                stats[move] = (total_visits + visits, total_wins + wins)
+
+        self.nodes = nodes
+        self.root_stats = stats
+        self.last_elapsed = time.perf_counter() - start
+        best = max(stats, key=lambda m: stats[m][0])
+        visits, wins = stats[best]
+        self.last_value = wins / visits if visits else None
+        self.principal_variation = self._line(root, state, best)
+        return state.to_game_move(best)
+
+    def _line(self, root: _Node, state: BitboardState, first: BitMove) -> List[Optional[Tuple[str, Position]]]:
+        """Línea más visitada del árbol local empezando por `first`."""
+        line = [state.to_game_move(first)]
+        node = next((c for c in root.children if c.move == first), None)
+        while node is not None and node.children:
+            node = max(node.children, key=lambda c: c.visits)
+            line.append(state.to_game_move(node.move) if node.move is not None else None)
+        return line
+
+    def _search(self, state: BitboardState, iterations: Optional[int], time_limit: Optional[float],
+                cancel: Optional[threading.Event] = None,
+                progress: Optional[Callable[[Dict[str, object]], None]] = None,
+                start: Optional[float] = None) -> _Node:
+        """Hace crecer un árbol desde `state` hasta agotar el presupuesto y devuelve la raíz."""
+        if start is None:
+            start = time.perf_counter()
+        deadline = start + time_limit if time_limit is not None else None
+        rnd = self._random
+        log = math.log
+        sqrt = math.sqrt
+        exploration = self.exploration
+        penalty = self.pass_penalty
+        root = _Node(None, None, 1 - state.turn)
+        root.untried = self._expand(state)
+        self.max_depth = 0
+        last_progress = start
+        done = 0
+        while iterations is None or done < iterations:
+            if done % self.CHECK_EVERY == 0 and done:
+                now = time.perf_counter()
+                if cancel is not None and cancel.is_set():
+                    break
+                if deadline is not None and now >= deadline:
+                    break
+                if progress is not None and now - last_progress >= self.PROGRESS_INTERVAL:
+                    last_progress = now
+                    progress(self._progress_info(root, state, now - start))
+            done += 1
+
+            node = root
+            undo = []
+            # penalizaciones por pase dentro del árbol, desde el lado 0
+            adjust = 0
+            # selección
+            while not node.untried and node.children:
+                scale = exploration * sqrt(log(node.visits))
+                best = None
+                best_score = -1.0
+                for child in node.children:
+                    score = child.wins / child.visits + scale / sqrt(child.visits)
+                    if score > best_score:
+                        best_score = score
+                        best = child
+                node = best
+                if node.move is None:
+                    adjust += penalty if state.turn else -penalty
+                    undo.append(state.make_pass())
+                else:
+                    undo.append(state.make(node.move))
+            # expansión
+            if node.untried:
+                untried = node.untried
+                i = rnd.randrange(len(untried))
+                move = untried[i]
+                untried[i] = untried[-1]
+                untried.pop()
+                mover = state.turn
+                if move is None:
+                    adjust += penalty if mover else -penalty
+                    undo.append(state.make_pass())
+                else:
+                    undo.append(state.make(move))
+                child = _Node(move, node, mover)
+                child.untried = self._expand(state)
+                node.children.append(child)
+                node = child
+            if len(undo) > self.max_depth:
+                self.max_depth = len(undo)
+            # simulación
+            margin = self._playout(state, rnd) + adjust
+            for record in reversed(undo):
+                state.unmake(record)
+            # propagación: resultado desde el lado 0
+            reward = 1.0 if margin > 0 else 0.5 if margin == 0 else 0.0
+            while node is not None:
+                node.visits += 1
+                node.wins += reward if node.mover == 0 else 1.0 - reward
+                node = node.parent
+        return root
+
+    def _expand(self, state: BitboardState) -> List[Optional[BitMove]]:
+        """Movimientos de un nodo nuevo: los legales, un pase (None) o ninguno si acabó."""
+        moves: List[Optional[BitMove]] = list(state.generate_moves(state.turn))
+        if not moves and state.has_moves(1 - state.turn):
+            moves.append(None)
+        return moves
+
+    def _playout(self, state: BitboardState, rnd: random.Random) -> int:
+        """Termina la partida desde `state` y devuelve el margen final del lado 0.
+
+        No modifica `state`: todo el estado de la simulación vive en enteros
+        locales (y una copia de las casillas de los caballos).
+        """
+        attacks = state.tables.attacks
+        values = state.values
+        owners = state.owners
+        horses = list(state.horses)
+        nhorses = len(horses)
+        taken = state.blocked | state.occupied
+        positive = state.positive
+        negative = state.negative
+        diff = state.scores[0] - state.scores[1]
+        turn = state.turn
+        penalty = self.pass_penalty
+        greedy = self.greedy
+        chance = rnd.random
+        while True:
+            free = ~taken
+            total = 0
+            for hidx in range(nhorses):
+                if owners[hidx] == turn:
+                    total += popcount(attacks[horses[hidx]] & free)
+            if not total:
+                other = 1 - turn
+                if not any(owners[h] == other and attacks[horses[h]] & free for h in range(nhorses)):
+                    return diff
+                diff += penalty if turn else -penalty
+                turn = other
+                continue
+            move_horse = -1
+            to = -1
+            allowed = free
+            if greedy and chance() < greedy:
+                best = 0
+                safe = 0
+                for hidx in range(nhorses):
+                    if owners[hidx] != turn:
+                        continue
+                    targets = attacks[horses[hidx]] & free
+                    for sq in iter_bits(targets & positive):
+                        if values[sq] > best:
+                            best = values[sq]
+                            move_horse = hidx
+                            to = sq
+                    safe += popcount(targets & ~negative)
+                if move_horse < 0 and safe:
+                    allowed = free & ~negative
+                    total = safe
+            if move_horse < 0:
+                k = int(chance() * total)
+                for hidx in range(nhorses):
+                    if owners[hidx] != turn:
+                        continue
+                    targets = attacks[horses[hidx]] & allowed
+                    count = popcount(targets)
+                    if k < count:
+                        for _ in range(k):
+                            targets &= targets - 1
+                        move_horse = hidx
+                        to = (targets & -targets).bit_length() - 1
+                        break
+                    k -= count
+            bit = 1 << to
+            if (positive | negative) & bit:
+                diff += values[to] if turn == 0 else -values[to]
+                positive &= ~bit
+                negative &= ~bit
+            taken |= bit
+            horses[move_horse] = to
+            turn = 1 - turn
+
+    def _progress_info(self, root: _Node, state: BitboardState, elapsed: float) -> Dict[str, object]:
+        best = max(root.children, key=lambda c: c.visits) if root.children else None
+        move = state.to_game_move(best.move) if best is not None and best.move is not None else None
+        return {
+            "depth": self.max_depth,
+            "move": move,
+            "value": best.wins / best.visits if best is not None else None,
+            "pv": [move] if move is not None else [],
+            "nodes": root.visits,
+            "elapsed": elapsed,
+            "proven": None,
+        }
+
+    def _worker_config(self) -> Dict[str, object]:
+        return {
+            "player_id": self.player_id,
+            "playout": self.playout,
+            "exploration": self.exploration,
+            "greedy": self.greedy,
+        }
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = process_pool(self.workers - 1)
+        return self._pool
+
+    def reset(self) -> None:
+        """Sin efecto: cada jugada construye un árbol nuevo (misma interfaz que `AIPlayer`)."""
+
+    def close(self) -> None:
+        """Cierra el pool de procesos del modo paralelo, si se creó."""
+        if self._pool is not None:
+            self._pool.shutdown(wait=False)
+            self._pool = None
+
+
+def _mcts_task(config: Dict[str, object], state: BitboardState, iterations: Optional[int],
+               seconds: Optional[float], seed: int) -> Tuple[Dict[Optional[BitMove], Tuple[int, float]], int]:
+    """Hace crecer un árbol en un proceso auxiliar y devuelve (visitas y victorias por movimiento, iteraciones)."""
+    player = MCTSPlayer(config["player_id"], playout=config["playout"],
+                        exploration=config["exploration"], greedy=config["greedy"], seed=seed)
+    root = player._search(state, iterations, seconds)
+    return {child.move: (child.visits, child.wins) for child in root.children}, root.visits
@@ -0,0 +1,216 @@
+"""Registro compacto de una partida: posición inicial y jugadas.
+
+Cada casilla (x, y) se guarda como su índice `y * width + x` (como en
+`bitboard`). El formato binario es una cabecera con la posición inicial
+(tamaño, jugadores, caballos, casillas con puntos y turno) seguida de un
+registro de tamaño fijo por jugada, `MOVE` (5 bytes): índice del caballo,
+casilla de destino y puntos que cambiaron en el marcador. Un pase lleva
+`PASS` como caballo y la penalización como puntos; `UNDO` anula el registro
+anterior, de modo que un fichero que se escribe mientras se juega (ver
+`attach`) sigue siendo válido aunque se deshagan jugadas.
+
+`Game.initialize` abre el registro con `GameRecord.from_game` y el camino
+inverso, de registro a posición, es `game.replay`, así que aquí no hace
+falta importar `game`.
+"""
+import struct
+from typing import BinaryIO, Dict, Iterator, List, Optional, Tuple
+
+Position = Tuple[int, int]
+# (índice del caballo o None para un pase, destino o None, puntos)
+RecordEntry = Tuple[Optional[int], Optional[Position], int]
+
+MAGIC = b"SHR1"
+# magic, ancho, alto, jugadores, caballos, casillas con puntos, turno inicial
+HEADER = struct.Struct("<4sHHBBHB")
+HORSE = struct.Struct("<BH")
+POINT = struct.Struct("<Hh")
+MOVE = struct.Struct("<BHh")
+PASS = 0xFF
+UNDO = 0xFE
+
+
+def _pack_str(text: str) -> bytes:
+    data = text.encode("utf-8")
+    return bytes([len(data)]) + data
+
+
+def _unpack_str(data: bytes, offset: int) -> Tuple[str, int]:
+    size = data[offset]
+    end = offset + 1 + size
+    return data[offset + 1:end].decode("utf-8"), end
+
+
+class GameRecord:
+    """Posición inicial de una partida más sus jugadas empaquetadas.
+
+    `horses` es la lista de (id, dueño, casilla inicial) en el orden de
+    `Game.horses`; las jugadas se refieren a los caballos por su índice en
+    ella. Las jugadas viven en un `bytearray` (`moves`), así que añadir o
+    quitar una no crea objetos y la partida entera ocupa unos pocos cientos
+    de bytes.
+    """
+
+    # Las casillas se guardan en 16 bits
+    MAX_CELLS = 0x10000
+
+    def __init__(self, width: int, height: int, players: List[str],
+                 horses: List[Tuple[str, str, Position]], points: Dict[Position, int],
+                 turn: Optional[str]):
+        if not self.supports(width, height):
+            raise ValueError("Board too large for a game record")
+        self.width = width
+        self.height = height
+        self.players = list(players)
+        self.horses = list(horses)
+        self.points = dict(points)
+        self.turn = turn
+        self.horse_index = {hid: i for i, (hid, _owner, _pos) in enumerate(self.horses)}
+        self.moves = bytearray()
+        self.stream: Optional[BinaryIO] = None
+
+    @classmethod
+    def supports(cls, width: int, height: int) -> bool:
+        """Si el formato puede guardar partidas de `width` x `height` (hasta 256x256)."""
+        return width * height <= cls.MAX_CELLS
+
+    @classmethod
+    def from_game(cls, game) -> 'GameRecord':
+        """Registro vacío de una partida que aún no ha empezado.
+
+        La cabecera solo guarda lo que cambia de una partida a otra al
+        crearla: sin puntuaciones ni casillas bloqueadas aparte de las de
+        salida de los caballos, que es lo que `replay` reconstruye. Para una
+        partida ya empezada lanza ValueError; `copy` sirve para quedarse con
+        parte de un registro.
+        """
+        blocked = {h.pos for h in game.horses.values()}
+        if any(game.scores.values()) or game.board.blocked != blocked:
+            raise ValueError("Game already started; records start from a fresh game")
+        players = sorted({h.owner for h in game.horses.values()} | set(game.scores))
+        horses = [(hid, h.owner, h.pos) for hid, h in game.horses.items()]
+        return cls(game.board.width, game.board.height, players, horses, game.board.points, game.turn)
+
+    def __len__(self) -> int:
+        return len(self.moves) // MOVE.size
+
+    def __getstate__(self):
+        # deepcopy y pickle no se llevan el fichero (como `copy`)
+        state = self.__dict__.copy()
+        state["stream"] = None
+        return state
+
+    def copy(self, plies: Optional[int] = None) -> 'GameRecord':
+        """Copia sin fichero asociado con solo las primeras `plies` jugadas."""
+        other = GameRecord(self.width, self.height, self.players, self.horses, self.points, self.turn)
+        end = len(self.moves) if plies is None else plies * MOVE.size
+        other.moves = self.moves[:end]
+        return other
+
+    def _cell(self, pos: Position) -> int:
+        return pos[1] * self.width + pos[0]
+
+    def _pos(self, cell: int) -> Position:
+        return cell % self.width, cell // self.width
+
+    def _write(self, data: bytes) -> None:
+        if self.stream is not None:
+            self.stream.write(data)
+            self.stream.flush()
+
+    def append_move(self, horse_id: str, to: Position, points: int) -> None:
+        data = MOVE.pack(self.horse_index[horse_id], self._cell(to), points)
+        self.moves += data
+        self._write(data)
+
+    def append_pass(self, points: int) -> None:
+        data = MOVE.pack(PASS, 0, points)
+        self.moves += data
+        self._write(data)
+
+    def pop(self) -> RecordEntry:
+        """Quita la última jugada y la devuelve; en el fichero queda un `UNDO`."""
+        if not self.moves:
+            raise IndexError("pop from an empty game record")
+        entry = self.entry(len(self) - 1)
+        del self.moves[-MOVE.size:]
+        self._write(MOVE.pack(UNDO, 0, 0))
+        return entry
+
+    def _decode(self, horse: int, cell: int, points: int) -> RecordEntry:
+        if horse == PASS:
+            return None, None, points
+        return horse, self._pos(cell), points
+
+    def entry(self, ply: int) -> RecordEntry:
+        return self._decode(*MOVE.unpack_from(self.moves, ply * MOVE.size))
+
+    def entries(self, plies: Optional[int] = None) -> Iterator[RecordEntry]:
+        """Las primeras `plies` jugadas (todas si es None), en orden."""
+        end = len(self.moves) if plies is None else min(len(self.moves), plies * MOVE.size)
+        decode = self._decode
+        for horse, cell, points in MOVE.iter_unpack(bytes(self.moves[:end])):
+            yield decode(horse, cell, points)
+
+    def header(self) -> bytes:
+        players = self.players
+        parts = [HEADER.pack(MAGIC, self.width, self.height, len(players), len(self.horses),
+                             len(self.points), players.index(self.turn) if self.turn in players else 0xFF)]
+        parts.extend(_pack_str(pid) for pid in players)
+        for hid, owner, pos in self.horses:
+            parts.append(_pack_str(hid) + HORSE.pack(players.index(owner), self._cell(pos)))
+        parts.extend(POINT.pack(self._cell(pos), value) for pos, value in self.points.items())
+        return b"".join(parts)
+
+    def to_bytes(self) -> bytes:
+        return self.header() + bytes(self.moves)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'GameRecord':
+        """Lee un registro de `to_bytes` o de un fichero escrito con `attach`.
+
+        Los `UNDO` se aplican al leer; un registro final incompleto (el
+        fichero se cortó a mitad de escritura) se ignora.
+        """
+        magic, width, height, n_players, n_horses, n_points, turn = HEADER.unpack_from(data, 0)
+        if magic != MAGIC:
+            raise ValueError("Not a game record")
+        offset = HEADER.size
+        players = []
+        for _ in range(n_players):
+            pid, offset = _unpack_str(data, offset)
+            players.append(pid)
+        horses = []
+        for _ in range(n_horses):
+            hid, offset = _unpack_str(data, offset)
+            owner, cell = HORSE.unpack_from(data, offset)
+            offset += HORSE.size
+            horses.append((hid, players[owner], (cell % width, cell // width)))
+        points = {}
+        for _ in range(n_points):
+            cell, value = POINT.unpack_from(data, offset)
+            offset += POINT.size
+            points[(cell % width, cell // width)] = value
+        record = cls(width, height, players, horses, points, players[turn] if turn != 0xFF else None)
+        moves = record.moves
+        end = offset + (len(data) - offset) // MOVE.size * MOVE.size
+        for start in range(offset, end, MOVE.size):
+            if data[start] == UNDO:
+                del moves[-MOVE.size:]
+            else:
+                moves += data[start:start + MOVE.size]
+        return record
+
+    def attach(self, stream: BinaryIO) -> None:
+        """Escribe el registro en `stream` y sigue añadiendo cada jugada nueva."""
+        self.stream = stream
+        self._write(self.to_bytes())
+
+    def save(self, path: str) -> None:
+        with open(path, "wb") as f:
+            f.write(self.to_bytes())
+
+    @classmethod
+    def load(cls, path: str) -> 'GameRecord':
+        with open(path, "rb") as f:
+            return cls.from_bytes(f.read())
@@ -0,0 +1,551 @@
+"""Estructuras de apoyo para la búsqueda de `AIPlayer`.
+
+- `TranspositionTable`: tabla de transposiciones indexada por el hash Zobrist
+  de `BitboardState`, con memoria acotada y reemplazo en dos niveles
+  (preferencia por profundidad + reemplazo siempre).
+- `SearchAborted`: señal interna para cortar una iteración cuando se agota
+  el presupuesto de tiempo o de nodos.
+- `MoveOrderer` / `HeuristicMoveOrderer`: etapa de ordenación de movimientos
+  intercambiable para la poda alfa-beta.
+- `SearchStats`: instrumentación opcional (nodos por ply, podas, factor de
+  ramificación efectivo y reparto del tiempo), exportable a JSON y a traza
+  de Chrome.
+- `pool_context` / `process_pool`: procesos auxiliares de los modos
+  paralelos de `AIPlayer` y `MCTSPlayer`.
+"""
+import json
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+# Tipos de cota guardados en la tabla
+EXACT = 0
+LOWER = 1  # el valor real es >= value (corte beta)
+UPPER = 2  # el valor real es <= value (falló bajo alfa)
+
+# (key, depth, flag, value, best_move, age)
+TTEntry = Tuple[int, int, int, float, Any, int]
+
+
+class SearchAborted(Exception):
+    """Se lanzó al agotarse el presupuesto; la iteración en curso se descarta."""
+
+
+def pool_context():
+    """Contexto de `multiprocessing` de los pools (y de sus valores compartidos)."""
+    # "spawn" evita clonar hilos (p. ej. los de Tk) al crear los procesos
+    return multiprocessing.get_context("spawn")
+
+
+def process_pool(workers: int, initializer: Optional[Callable] = None,
+                 initargs: Tuple = ()) -> ProcessPoolExecutor:
+    """Pool de `workers` procesos auxiliares para una búsqueda paralela."""
+    return ProcessPoolExecutor(max_workers=workers, mp_context=pool_context(),
+                               initializer=initializer, initargs=initargs)
+
+
+class TranspositionTable:
+    """Tabla de transposiciones de tamaño fijo.
+
+    La tabla se organiza en cubetas de dos ranuras: la primera conserva la
+    entrada de mayor profundidad (`depth-preferred`) y la segunda siempre se
+    sobrescribe (`always-replace`). Cuando una entrada nueva desplaza a la de
+    la primera ranura, la antigua baja a la segunda en lugar de perderse.
+
+    El tamaño se fija con `max_entries` o con `max_mb` (se estima el coste de
+    una entrada en `ENTRY_BYTES`). Los contadores `probes`, `hits`, `cutoffs`,
+    `stores` y `overwrites` permiten medir cuánto trabajo ahorra.
+
+    La tabla puede conservarse entre búsquedas. Cada entrada guarda una edad
+    (`AIPlayer` usa el número de casillas bloqueadas de la posición, que
+    nunca baja en una partida); tras `age(min_age)` las entradas más jóvenes
+    que `min_age` ya no pueden volver a aparecer y se reemplazan antes que
+    cualquier otra, sea cual sea su profundidad.
+    """
+
+    DEFAULT_ENTRIES = 1 << 16
+    # tupla de 5 elementos + clave de 64 bits + float + movimiento
+    ENTRY_BYTES = 200
+
+    def __init__(self, max_entries: Optional[int] = None, max_mb: Optional[float] = None):
+        if max_entries is None:
+            if max_mb is not None:
+                max_entries = int(max_mb * 1024 * 1024 / self.ENTRY_BYTES)
+            else:
+                max_entries = self.DEFAULT_ENTRIES
+        if max_entries < 2:
+            raise ValueError("Transposition table needs room for at least 2 entries")
+        self.buckets = max_entries // 2
+        self.capacity = self.buckets * 2
+        self.slots: List[Optional[TTEntry]] = [None] * self.capacity
+        self.min_age = 0
+        self.reset_counters()
+
+    def reset_counters(self) -> None:
+        self.probes = 0
+        self.hits = 0
+        self.cutoffs = 0
+        self.stores = 0
+        self.overwrites = 0
+
+    def clear(self) -> None:
+        self.slots = [None] * self.capacity
+        self.min_age = 0
+        self.reset_counters()
+
+    def age(self, min_age: int) -> None:
+        """Marca como reemplazables las entradas con edad menor que `min_age`."""
+        self.min_age = min_age
+
+    def probe(self, key: int) -> Optional[TTEntry]:
+        """Devuelve la entrada guardada para `key`, o None."""
+        self.probes += 1
+        i = (key % self.buckets) * 2
+        slots = self.slots
+        entry = slots[i]
+        if entry is not None and entry[0] == key:
+            self.hits += 1
+            return entry
+        entry = slots[i + 1]
+        if entry is not None and entry[0] == key:
+            self.hits += 1
+            return entry
+        return None
+
+    def store(self, key: int, depth: int, flag: int, value: float, best_move: Any, age: int = 0) -> None:
+        self.stores += 1
+        i = (key % self.buckets) * 2
+        slots = self.slots
+        deep = slots[i]
+        entry = (key, depth, flag, value, best_move, age)
+        if deep is None or deep[0] == key or depth >= deep[1] or deep[5] < self.min_age:
+            if deep is not None and deep[0] != key and deep[5] >= self.min_age:
+                # la entrada desplazada pasa a la ranura de reemplazo
+                if slots[i + 1] is not None:
+                    self.overwrites += 1
+                slots[i + 1] = deep
+            slots[i] = entry
+        else:
+            if slots[i + 1] is not None and slots[i + 1][0] != key:
+                self.overwrites += 1
+            slots[i + 1] = entry
+
+    def used(self) -> int:
+        return sum(1 for e in self.slots if e is not None)
+
+    def stale(self) -> int:
+        return sum(1 for e in self.slots if e is not None and e[5] < self.min_age)
+
+    def stats(self) -> Dict[str, Any]:
+        """Contadores de uso, útiles para comparar profundidades."""
+        return {
+            "capacity": self.capacity,
+            "used": self.used(),
+            "stale": self.stale(),
+            "probes": self.probes,
+            "hits": self.hits,
+            "cutoffs": self.cutoffs,
+            "stores": self.stores,
+            "overwrites": self.overwrites,
+            "hit_rate": self.hits / self.probes if self.probes else 0.0,
+        }
+
+
+class MoveOrderer:
+    """Etapa de ordenación de movimientos para `AIPlayer`.
+
+    Esta clase base deja los movimientos en el orden de generación
+    (`KNIGHT_DELTAS`). Las subclases redefinen `order` y usan `record_cutoff`
+    para aprender de las podas. En todos los casos se lleva la cuenta de
+    cuántas podas produjo el primer movimiento probado: cuanto más cerca de 1
+    esté `first_move_cutoff_rate()`, más cerca se está de la poda ideal.
+    """
+
+    def __init__(self):
+        self.cutoffs = 0
+        self.first_move_cutoffs = 0
+
+    def new_search(self) -> None:
+        """Se llama al empezar una búsqueda sin nada aprendido antes."""
+        self.cutoffs = 0
+        self.first_move_cutoffs = 0
+
+    def carry_over(self, state, plies: int) -> None:
+        """Se llama en lugar de `new_search` cuando la búsqueda sigue la misma
+        partida `plies` jugadas después de la anterior, desde `state`.
+        """
+        self.cutoffs = 0
+        self.first_move_cutoffs = 0
+
+    def order(self, state, moves: List[Any], ply: int, tt_move: Any) -> List[Any]:
+        return moves
+
+    def record_cutoff(self, state, move: Any, ply: int, depth: int, index: int) -> None:
+        """`move` (el `index`-ésimo probado) produjo una poda a `ply` de la raíz."""
+        self.cutoffs += 1
+        if index == 0:
+            self.first_move_cutoffs += 1
+
+    def first_move_cutoff_rate(self) -> float:
+        return self.first_move_cutoffs / self.cutoffs if self.cutoffs else 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "cutoffs": self.cutoffs,
+            "first_move_cutoffs": self.first_move_cutoffs,
+            "first_move_cutoff_rate": self.first_move_cutoff_rate(),
+        }
+
+
+class HeuristicMoveOrderer(MoveOrderer):
+    """Ordena por ganancia inmediata de puntos, jugada de la tabla de
+    transposiciones, jugadas asesinas (killers) del mismo ply y, por último,
+    la tabla de historia.
+
+    - Ganancia: valor de la casilla destino para quien mueve (las casillas
+      negativas quedan al final).
+    - Killers: las dos últimas jugadas que produjeron poda en cada ply.
+    - Historia: suma de `depth * depth` de las podas de cada jugada.
+    """
+
+    KILLERS_PER_PLY = 2
+
+    def __init__(self):
+        super().__init__()
+        self.killers: List[List[Any]] = []
+        self.history: Dict[Any, int] = {}
+
+    def new_search(self) -> None:
+        super().new_search()
+        self.killers = []
+        self.history = {}
+
+    def carry_over(self, state, plies: int) -> None:
+        """Los killers de cada ply pasan `plies` plies más cerca de la raíz y
+        la historia se reduce a la mitad; se descartan las jugadas que ya
+        caen en una casilla bloqueada.
+        """
+        super().carry_over(state, plies)
+        blocked = state.blocked
+        if plies:
+            self.killers = [[m for m in slot if not blocked >> m[1] & 1] for slot in self.killers[plies:]]
+            self.history = {m: h // 2 for m, h in self.history.items() if h > 1 and not blocked >> m[1] & 1}
+
+    def order(self, state, moves: List[Any], ply: int, tt_move: Any) -> List[Any]:
+        if len(moves) < 2:
+            return moves
+        values = state.values
+        points = state.positive | state.negative
+        killers: Sequence[Any] = self.killers[ply] if ply < len(self.killers) else ()
+        history = self.history
+
+        def key(move):
+            to = move[1]
+            gain = values[to] if (points >> to) & 1 else 0
+            return (gain, move == tt_move, move in killers, history.get(move, 0))
+
+        moves.sort(key=key, reverse=True)
+        return moves
+
+    def record_cutoff(self, state, move: Any, ply: int, depth: int, index: int) -> None:
+        super().record_cutoff(state, move, ply, depth, index)
+        to = move[1]
+        if (state.positive | state.negative) >> to & 1:
+            # las capturas de puntos ya van primero; no ocupan killers
+            return
+        while len(self.killers) <= ply:
+            self.killers.append([])
+        slot = self.killers[ply]
+        if move not in slot:
+            slot.insert(0, move)
+            del slot[self.KILLERS_PER_PLY:]
+        self.history[move] = self.history.get(move, 0) + depth * depth
+
+
+class SearchStats:
+    """Estadísticas opcionales de la búsqueda: `AIPlayer(..., stats=SearchStats())`.
+
+    Sin este objeto la búsqueda no paga nada. Con él, `get_best_move`
+    envuelve durante la llamada los métodos del estado, del jugador y del
+    ordenador de movimientos para contar y cronometrar, así que los tiempos
+    absolutos salen algo inflados pero el reparto entre fases es
+    representativo. Los datos se acumulan entre llamadas (p. ej. una partida
+    entera) hasta `reset()`.
+
+    - `nodes_per_ply`: nodos visitados a cada distancia de la raíz.
+    - `leaf_evaluations`: llamadas a la heurística.
+    - `terminal_checks`: comprobaciones de fin de partida (el equivalente de
+      `Game.is_game_over` en la búsqueda; una por nodo).
+    - `cutoffs_by_index`: podas según la posición del movimiento que la causó.
+    - `state_builds`, `makes`, `passes`, `move_lists`: estados creados,
+      registros de deshacer y listas de movimientos generadas.
+    - `phase_time`: segundos en generación, ordenación, movilidad/fin de
+      partida, evaluación y make/unmake.
+    - `iterations`: una entrada por iteración de la profundización iterativa,
+      con sus nodos, duración y factor de ramificación efectivo (EBF).
+
+    En el modo paralelo solo se instrumenta el proceso principal; los nodos
+    de los procesos auxiliares cuentan en las iteraciones pero no en el resto.
+    """
+
+    PHASES = ("movegen", "ordering", "terminal_check", "evaluation", "make_unmake")
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self) -> None:
+        self.searches = 0
+        self.nodes_per_ply: List[int] = []
+        self.leaf_evaluations = 0
+        self.terminal_checks = 0
+        self.cutoffs_by_index: Dict[int, int] = {}
+        self.state_builds = 0
+        self.makes = 0
+        self.passes = 0
+        self.move_lists = 0
+        self.phase_time: Dict[str, float] = {phase: 0.0 for phase in self.PHASES}
+        self.iterations: List[Dict[str, Any]] = []
+        self.search_log: List[Dict[str, Any]] = []
+        self.tt: Optional[Dict[str, Any]] = None
+        self.ordering: Optional[Dict[str, Any]] = None
+        self._origin = time.perf_counter()
+        self._patched: List[Tuple[Any, str]] = []
+        self._search_start = 0.0
+        self._iteration_start = 0.0
+        self._iteration_nodes = 0
+        self._iteration_phases: Dict[str, float] = {}
+        self._previous_nodes: Optional[int] = None
+
+    # -- enganche con AIPlayer ---------------------------------------------
+
+    def begin_search(self, player, state) -> None:
+        """Empieza una llamada a `get_best_move` e instala los contadores."""
+        self.searches += 1
+        self.state_builds += 1
+        self._search_start = time.perf_counter()
+        self._iteration_start = self._search_start
+        self._iteration_nodes = 0
+        self._iteration_phases = dict(self.phase_time)
+        self._previous_nodes = None
+        self._instrument(player, state)
+
+    def end_iteration(self, depth: int, nodes: int, completed: bool) -> None:
+        """Cierra una iteración; `nodes` es el total acumulado de la búsqueda."""
+        now = time.perf_counter()
+        iteration_nodes = nodes - self._iteration_nodes
+        ebf = None
+        if completed and self._previous_nodes:
+            ebf = iteration_nodes / self._previous_nodes
+        self.iterations.append({
+            "search": self.searches,
+            "depth": depth,
+            "completed": completed,
+            "nodes": iteration_nodes,
+            "start": self._iteration_start - self._origin,
+            "elapsed": now - self._iteration_start,
+            "ebf": ebf,
+            "phases": {p: self.phase_time[p] - self._iteration_phases[p] for p in self.PHASES},
+        })
+        if completed:
+            self._previous_nodes = iteration_nodes
+        self._iteration_start = now
+        self._iteration_nodes = nodes
+        self._iteration_phases = dict(self.phase_time)
+
+    def end_search(self, player) -> None:
+        """Quita los contadores y guarda el resumen de la llamada."""
+        for obj, name in self._patched:
+            vars(obj).pop(name, None)
+        self._patched = []
+        self.search_log.append({
+            "search": self.searches,
+            "start": self._search_start - self._origin,
+            "elapsed": time.perf_counter() - self._search_start,
+            "nodes": player.nodes,
+            "completed_depth": player.completed_depth,
+            "value": player.last_value,
+        })
+        if player.tt is not None:
+            self.tt = player.tt.stats()
+        self.ordering = player.move_orderer.stats()
+
+    def _patch(self, obj, name: str, wrapper) -> None:
+        setattr(obj, name, wrapper)
+        self._patched.append((obj, name))
+
+    def _instrument(self, player, state) -> None:
+        perf = time.perf_counter
+        phases = self.phase_time
+        nodes_per_ply = self.nodes_per_ply
+        cutoffs = self.cutoffs_by_index
+
+        negamax = player._negamax
+        evaluate = player._evaluate_position
+        generate_moves = state.generate_moves
+        mobility = state.mobility
+        make = state.make
+        make_pass = state.make_pass
+        unmake = state.unmake
+        order = player.move_orderer.order
+        record_cutoff = player.move_orderer.record_cutoff
+
+        def counted_negamax(state, depth, alpha, beta):
+            ply = player._root_depth - depth
+            while len(nodes_per_ply) <= ply:
+                nodes_per_ply.append(0)
+            nodes_per_ply[ply] += 1
+            self.terminal_checks += 1
+            return negamax(state, depth, alpha, beta)
+
+        def timed_evaluate(state, ai_moves=None, opponent_moves=None):
+            self.leaf_evaluations += 1
+            t = perf()
+            value = evaluate(state, ai_moves, opponent_moves)
+            phases["evaluation"] += perf() - t
+            return value
+
+        def timed_generate_moves(side):
+            self.move_lists += 1
+            t = perf()
+            moves = generate_moves(side)
+            phases["movegen"] += perf() - t
+            return moves
+
+        def timed_mobility(side):
+            t = perf()
+            count = mobility(side)
+            phases["terminal_check"] += perf() - t
+            return count
+
+        def timed_make(move):
+            self.makes += 1
+            t = perf()
+            undo = make(move)
+            phases["make_unmake"] += perf() - t
+            return undo
+
+        def timed_make_pass():
+            self.passes += 1
+            t = perf()
+            undo = make_pass()
+            phases["make_unmake"] += perf() - t
+            return undo
+
+        def timed_unmake(undo):
+            t = perf()
+            unmake(undo)
+            phases["make_unmake"] += perf() - t
+
+        def timed_order(state, moves, ply, tt_move):
+            t = perf()
+            moves = order(state, moves, ply, tt_move)
+            phases["ordering"] += perf() - t
+            return moves
+
+        def counted_cutoff(state, move, ply, depth, index):
+            cutoffs[index] = cutoffs.get(index, 0) + 1
+            record_cutoff(state, move, ply, depth, index)
+
+        self._patch(player, "_negamax", counted_negamax)
+        self._patch(player, "_evaluate_position", timed_evaluate)
+        self._patch(state, "generate_moves", timed_generate_moves)
+        self._patch(state, "mobility", timed_mobility)
+        self._patch(state, "make", timed_make)
+        self._patch(state, "make_pass", timed_make_pass)
+        self._patch(state, "unmake", timed_unmake)
+        self._patch(player.move_orderer, "order", timed_order)
+        self._patch(player.move_orderer, "record_cutoff", counted_cutoff)
+
+    # -- resultados ----------------------------------------------------------
+
+    @property
+    def nodes(self) -> int:
+        return sum(self.nodes_per_ply)
+
+    def effective_branching_factor(self) -> Optional[float]:
+        """Media geométrica de nodos(d) / nodos(d-1) de las iteraciones completas."""
+        ratios = [it["ebf"] for it in self.iterations if it["ebf"]]
+        if not ratios:
+            return None
+        product = 1.0
+        for r in ratios:
+            product *= r
+        return product ** (1.0 / len(ratios))
+
+    def to_dict(self) -> Dict[str, Any]:
+        total_cutoffs = sum(self.cutoffs_by_index.values())
+        return {
+            "searches": self.searches,
+            "nodes": self.nodes,
+            "nodes_per_ply": list(self.nodes_per_ply),
+            "leaf_evaluations": self.leaf_evaluations,
+            "terminal_checks": self.terminal_checks,
+            "cutoffs": total_cutoffs,
+            "cutoffs_by_index": {str(k): v for k, v in sorted(self.cutoffs_by_index.items())},
+            "first_move_cutoff_rate": self.cutoffs_by_index.get(0, 0) / total_cutoffs if total_cutoffs else 0.0,
+            "effective_branching_factor": self.effective_branching_factor(),
+            "state_builds": self.state_builds,
+            "makes": self.makes,
+            "passes": self.passes,
+            "move_lists": self.move_lists,
+            "phase_time": dict(self.phase_time),
+            "iterations": list(self.iterations),
+            "search_log": list(self.search_log),
+            "tt": self.tt,
+            "ordering": self.ordering,
+        }
+
+    def to_json(self, path: Optional[str] = None) -> str:
+        text = json.dumps(self.to_dict(), indent=2)
+        if path is not None:
+            with open(path, "w") as f:
+                f.write(text)
+        return text
+
+    def to_chrome_trace(self) -> Dict[str, Any]:
+        """Perfil en el formato de eventos de traza de Chrome.
+
+        Se abre en `chrome://tracing` o en https://ui.perfetto.dev. Cada
+        llamada a `get_best_move` y cada iteración son eventos con su tiempo
+        real; dentro de cada iteración las fases aparecen una tras otra con
+        su tiempo acumulado (no son intervalos reales, sino el agregado, como
+        en un flamegraph), más "search" con el resto.
+        """
+        def us(seconds: float) -> float:
+            return round(seconds * 1e6, 3)
+
+        events: List[Dict[str, Any]] = []
+        for search in self.search_log:
+            events.append({
+                "name": "get_best_move", "ph": "X", "pid": 1, "tid": 1,
+                "ts": us(search["start"]), "dur": us(search["elapsed"]),
+                "args": {"nodes": search["nodes"], "completed_depth": search["completed_depth"],
+                         "value": search["value"]},
+            })
+        for it in self.iterations:
+            events.append({
+                "name": f"depth {it['depth']}", "ph": "X", "pid": 1, "tid": 1,
+                "ts": us(it["start"]), "dur": us(it["elapsed"]),
+                "args": {"nodes": it["nodes"], "completed": it["completed"], "ebf": it["ebf"]},
+            })
+            offset = it["start"]
+            phases = dict(it["phases"])
+            phases["search"] = max(0.0, it["elapsed"] - sum(phases.values()))
+            for name, seconds in phases.items():
+                if seconds <= 0.0:
+                    continue
+                events.append({
+                    "name": name, "ph": "X", "pid": 1, "tid": 1,
+                    "ts": us(offset), "dur": us(seconds), "args": {"aggregated": True},
+                })
+                offset += seconds
+            events.append({
+                "name": "nodes", "ph": "C", "pid": 1, "tid": 1,
+                "ts": us(it["start"]), "args": {"nodes": it["nodes"]},
+            })
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def write_chrome_trace(self, path: str) -> None:
+        with open(path, "w") as f:
+            json.dump(self.to_chrome_trace(), f)
@@ -0,0 +1,252 @@
+"""Torneo sin interfaz gráfica entre dos configuraciones de la IA.
+
+Juega N partidas con semilla entre dos motores (cada semilla dos veces, con
+los colores invertidos), repartidas en un pool de
+procesos, escribe el resultado de cada partida en un fichero JSONL a medida
+que terminan y al final resume victorias/empates/derrotas, diferencia de Elo,
+latencia media por jugada y nodos por segundo.
+
+Ejemplo:
+
+    python tournament.py --games 200 --workers 8 \\
+        --engine-a depth=6,time=0.5 --engine-b depth=4 --out torneo.jsonl
+
+Cada motor se describe como `clave=valor` separados por comas:
+`depth` (número o `none`), `time` (segundos por jugada), `nodes` (límite de
+nodos), `weights` (pesos de puntuación:movilidad:proximidad, p. ej.
+`1:0.5:0.3`), `endgame` (casillas alcanzables para resolver el final
+exacto; 0 lo desactiva) y `reuse` (0 para empezar cada jugada sin lo
+aprendido en las anteriores). Con `engine=mcts` el motor es un `MCTSPlayer`
+(ver `mcts.py`), que acepta `time`, `iterations`, `playout` (`random` o
+`greedy`), `exploration` y `workers`; para comparar a igual tiempo:
+
+    python tournament.py --engine-a engine=mcts,time=0.5 --engine-b depth=none,time=0.5
+
+Las reglas son las de la GUI: P1 siempre empieza
+y quien no puede moverse pierde `Game.PASS_PENALTY` puntos mientras el otro
+siga jugando.
+"""
+import argparse
+import json
+import math
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Dict, List, Optional
+
+from game import create_random_game, AIPlayer
+from mcts import MCTSPlayer
+
+ENGINES = {"minimax": AIPlayer, "mcts": MCTSPlayer}
+
+
+def parse_engine(spec: str) -> Dict[str, Any]:
+    """Convierte `depth=4,time=0.2,weights=1:0.5:0.3` en un dict de configuración."""
+    config: Dict[str, Any] = {}
+    if not spec:
+        return config
+    for item in spec.split(","):
+        key, sep, value = item.partition("=")
+        key = key.strip()
+        value = value.strip()
+        if not sep:
+            raise ValueError(f"Invalid engine option {item!r} (expected key=value)")
+        if key == "engine":
+            if value not in ENGINES:
+                raise ValueError(f"Unknown engine {value!r} (expected one of {', '.join(ENGINES)})")
+            config["engine"] = value
+        elif key == "depth":
+            config["depth"] = None if value.lower() == "none" else int(value)
+        elif key == "time":
+            config["time_limit"] = float(value)
+        elif key == "nodes":
+            config["node_limit"] = int(value)
+        elif key == "endgame":
+            config["endgame_cells"] = int(value)
+        elif key == "iterations":
+            config["iterations"] = int(value)
+        elif key == "playout":
+            config["playout"] = value
+        elif key == "exploration":
+            config["exploration"] = float(value)
+        elif key == "workers":
+            config["workers"] = int(value)
+        elif key == "reuse":
+            config["reuse_search"] = value.lower() not in ("0", "false", "no")
+        elif key == "weights":
+            weights = tuple(float(w) for w in value.split(":"))
+            if len(weights) != 3:
+                raise ValueError("weights needs three values: score:mobility:proximity")
+            config["weights"] = weights
+        else:
+            raise ValueError(f"Unknown engine option {key!r}")
+    return config
+
+
+def create_engine(player_id: str, config: Dict[str, Any]):
+    options = dict(config)
+    engine = ENGINES[options.pop("engine", "minimax")]
+    return engine(player_id, **options)
+
+
+def play_game(index: int, seed: int, size: int, config_a: Dict[str, Any], config_b: Dict[str, Any],
+              max_plies: int = 10000) -> Dict[str, Any]:
+    """Juega una partida completa; en las partidas impares el motor B es P1."""
+    a_is_p1 = index % 2 == 0
+    players = {"P1": "A", "P2": "B"} if a_is_p1 else {"P1": "B", "P2": "A"}
+    configs = {"A": config_a, "B": config_b}
+    engines = {pid: create_engine(pid, configs[name]) for pid, name in players.items()}
+    stats = {name: {"moves": 0, "time": 0.0, "nodes": 0} for name in ("A", "B")}
+
+    game = create_random_game(width=size, height=size, seed=seed, player_ids=["P1", "P2"])
+    plies = 0
+    passes = 0
+    over, reason, winner_id = game.is_game_over()
+    while not over and plies < max_plies:
+        if not game.generate_moves_for_player(game.turn):
+            game.apply_pass()
+            passes += 1
+            plies += 1
+            over, reason, winner_id = game.is_game_over()
+            continue
+        engine = engines[game.turn]
+        name = players[game.turn]
+        start = time.perf_counter()
+        move = engine.get_best_move(game)
+        stats[name]["time"] += time.perf_counter() - start
+        stats[name]["moves"] += 1
+        stats[name]["nodes"] += getattr(engine, "nodes", 0)
+        game.apply_move(move[0], move[1])
+        plies += 1
+        over, reason, winner_id = game.is_game_over()
+    for engine in engines.values():
+        if hasattr(engine, "close"):
+            engine.close()
+
+    scores = {players[pid]: game.scores.get(pid, 0) for pid in players}
+    if not over:
+        reason = "max_plies_reached"
+        if game.scores["P1"] != game.scores["P2"]:
+            winner_id = "P1" if game.scores["P1"] > game.scores["P2"] else "P2"
+    return {
+        "game": index,
+        "seed": seed,
+        "size": size,
+        "p1": players["P1"],
+        "winner": players[winner_id] if winner_id is not None else None,
+        "reason": reason,
+        "scores": scores,
+        "margin": scores["A"] - scores["B"],
+        "plies": plies,
+        "passes": passes,
+        "stats": stats,
+    }
+
+
+def elo_difference(score: float) -> float:
+    """Diferencia de Elo correspondiente a una fracción de puntos `score` (0..1)."""
+    if score <= 0.0:
+        return -math.inf
+    if score >= 1.0:
+        return math.inf
+    return 400.0 * math.log10(score / (1.0 - score))
+
+
+def summarize(results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    wins = sum(1 for r in results if r["winner"] == "A")
+    losses = sum(1 for r in results if r["winner"] == "B")
+    draws = len(results) - wins - losses
+    games = len(results)
+    score = (wins + 0.5 * draws) / games if games else 0.0
+    engines = {}
+    for name in ("A", "B"):
+        moves = sum(r["stats"][name]["moves"] for r in results)
+        seconds = sum(r["stats"][name]["time"] for r in results)
+        nodes = sum(r["stats"][name]["nodes"] for r in results)
+        engines[name] = {
+            "moves": moves,
+            "avg_move_ms": 1000.0 * seconds / moves if moves else 0.0,
+            "nodes_per_sec": nodes / seconds if seconds else 0.0,
+        }
+    return {
+        "games": games,
+        "wins": wins,
+        "draws": draws,
+        "losses": losses,
+        "score": score,
+        "elo_diff": elo_difference(score) if games else 0.0,
+        "avg_margin": sum(r["margin"] for r in results) / games if games else 0.0,
+        "engines": engines,
+    }
+
+
+def run_tournament(config_a: Dict[str, Any], config_b: Dict[str, Any], games: int, seed: int = 0,
+                   size: int = 8, workers: int = 1, out=None) -> Dict[str, Any]:
+    """Juega `games` partidas y devuelve el resumen.
+
+    Las partidas van por parejas con la misma semilla (`seed`, `seed`,
+    `seed + 1`, `seed + 1`, ...) y colores invertidos, para que ningún motor
+    se beneficie de una posición inicial concreta.
+
+    Si se da `out` (fichero abierto), cada resultado se escribe como una
+    línea JSON en cuanto termina la partida.
+    """
+    results: List[Dict[str, Any]] = []
+
+    def record(result: Dict[str, Any]) -> None:
+        results.append(result)
+        if out is not None:
+            out.write(json.dumps(result) + "\n")
+            out.flush()
+
+    if workers <= 1:
+        for i in range(games):
+            record(play_game(i, seed + i // 2, size, config_a, config_b))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(play_game, i, seed + i // 2, size, config_a, config_b) for i in range(games)]
+            for future in as_completed(futures):
+                record(future.result())
+    results.sort(key=lambda r: r["game"])
+    return summarize(results)
+
+
+def format_summary(summary: Dict[str, Any]) -> str:
+    lines = [
+        f"Partidas: {summary['games']}  A gana: {summary['wins']}  Empates: {summary['draws']}  "
+        f"B gana: {summary['losses']}",
+        f"Puntuación de A: {summary['score']:.3f}  Diferencia Elo (A - B): {summary['elo_diff']:+.1f}  "
+        f"Margen medio: {summary['avg_margin']:+.2f}",
+    ]
+    for name, data in summary["engines"].items():
+        lines.append(f"Motor {name}: {data['moves']} jugadas, {data['avg_move_ms']:.1f} ms/jugada, "
+                     f"{data['nodes_per_sec']:.0f} nodos/s")
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Torneo sin GUI entre dos configuraciones de la IA")
+    parser.add_argument('--games', type=int, default=100, help='number of games')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the first game')
+    parser.add_argument('--size', type=int, default=8, help='board size')
+    parser.add_argument('--workers', type=int, default=1, help='parallel game processes')
+    parser.add_argument('--engine-a', type=str, default='depth=4', help='engine A options')
+    parser.add_argument('--engine-b', type=str, default='depth=2', help='engine B options')
+    parser.add_argument('--out', type=str, help='JSONL file for per-game results')
+    args = parser.parse_args(argv)
+
+    config_a = parse_engine(args.engine_a)
+    config_b = parse_engine(args.engine_b)
+    out = open(args.out, 'w') if args.out else None
+    try:
+        summary = run_tournament(config_a, config_b, args.games, seed=args.seed, size=args.size,
+                                 workers=args.workers, out=out)
+    finally:
+        if out is not None:
+            out.close()
+    print(format_summary(summary))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())